@@ -1,29 +1,166 @@
-import os, sys
-import joblib
+import os, sys, time
 import streamlit as st
 import pandas as pd
 import numpy as np
+import altair as alt
 
 # Make utils importable
 sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 import utils
+import artifacts
+import forecast
+import instrument
+from pred_cache import PredictionCache, artifact_fingerprint
+from lattice import Lattice
+from daily import DailyForecaster
+import explain
+import sweep
+import warmup
+import registry
 
 # Paths
-MODEL_PATH = os.path.join("models", "bike_model.pkl")
-COLS_PATH = os.path.join("models", "feature_columns.pkl")
+MODELS_DIR = "models"
+# versioned models from train_model.py --registry_dir; its LIVE version is served instead of MODELS_DIR
+REGISTRY_DIR = os.path.join(MODELS_DIR, "registry")
+SHADOW_LOG = os.path.join(REGISTRY_DIR, "shadow.jsonl")
+LATTICE_DIR = os.path.join("models", "lattice")
+DAILY_DIR = os.path.join("models", "daily")
+DATA_PATH = os.path.join("data", "hour.csv")
+# cold-start and time-to-first-prediction of every app process, one JSON line per event
+STARTUP_LOG = os.path.join("models", "startup_metrics.jsonl")
+# optional SQLite file shared by all app workers as a second cache tier
+PRED_CACHE_DB = os.environ.get("RIDEWISE_PRED_CACHE_DB")
+
+def load_prediction_cache(models_dir):
+    # keyed on the artifact hash, so retraining invalidates every cached prediction
+    flat_dir = os.path.join(models_dir, "bike_model_flat")
+    model_path = flat_dir if os.path.isdir(flat_dir) else os.path.join(models_dir, "bike_model.pkl")
+    return PredictionCache(artifact_fingerprint(model_path), maxsize=4096, disk_path=PRED_CACHE_DB)
+
+def load_serving(models_dir):
+    # everything predictions need, loaded as the other servers do; runs on a background loader thread
+    model, feature_columns, plan, lag_index = artifacts.load_artifacts(models_dir, DATA_PATH)
+    return {
+        "models_dir": models_dir,
+        "model": model,
+        "feature_columns": feature_columns,
+        "encoding_plan": plan,
+        "lag_index": lag_index,
+        "prediction_cache": load_prediction_cache(models_dir),
+        # walks the forest's decision paths; None for models that are not forests
+        "explainer": explain.as_flat(model),
+    }
+
+def warm_serving(res):
+    warmup.warm_model(res["model"], res["encoding_plan"], res["lag_index"])
+
+def predict_total(res, samples):
+    return utils.predict_batch(res["model"], samples, plan=res["encoding_plan"], lag_index=res["lag_index"])
 
 @st.cache_resource
-def load_model_and_cols():
-    model = joblib.load(MODEL_PATH)
-    feature_columns = joblib.load(COLS_PATH)
-    return model, feature_columns
+def start_serving():
+    # one per server process, loading in the background so the first visitor gets the UI at once;
+    # with a registry, a newly promoted LIVE version is swapped in once warm and CANDIDATE is shadow-scored
+    def make_loader(models_dir):
+        return warmup.BackgroundLoader(lambda: load_serving(models_dir), warm_serving, log_path=STARTUP_LOG).start()
+    reg = registry.ModelRegistry(REGISTRY_DIR)
+    live = registry.HotSwap(lambda: reg.live_dir() or MODELS_DIR, make_loader)
+    candidate = registry.HotSwap(reg.candidate_dir, make_loader)
+    return live, registry.ShadowScorer(candidate, predict_total, SHADOW_LOG)
+
+@st.cache_resource
+def load_lattice():
+    # optional precomputed what-if grid built by src/lattice.py
+    if os.path.exists(os.path.join(LATTICE_DIR, "meta.json")):
+        return Lattice.load(LATTICE_DIR)
+    return None
+
+@st.cache_resource
+def load_daily_forecaster():
+    # optional daily-total model + hourly profiles built by src/daily.py
+    if os.path.exists(os.path.join(DAILY_DIR, "daily_model.pkl")):
+        return DailyForecaster.load(DAILY_DIR)
+    return None
+
+hot_swap, shadow = start_serving()
+loader = hot_swap.check()
+lattice = load_lattice()
+daily_forecaster = load_daily_forecaster()
 
-model, feature_columns = load_model_and_cols()
+def serving():
+    # widgets render before the model is ready; only actions that need it wait here
+    if not loader.ready.is_set():
+        with st.spinner("⏳ Loading the prediction model..."):
+            loader.wait()
+    return loader.wait()
 
-def predict_bikes(sample_input):
-    X_enc = utils.prepare_input_df(sample_input, feature_columns)
-    pred = model.predict(X_enc)[0]
-    return max(0, int(round(pred)))
+# quantiles of the per-tree predictions shown around each forest prediction
+INTERVAL_QUANTILES = (0.1, 0.5, 0.9)
+
+FIELD_LABELS = {
+    "hr": "⏰ Hour of Day", "temp": "🌡️ Temperature", "atemp": "🌡️ Feels-like Temp",
+    "hum": "💧 Humidity", "windspeed": "🌬️ Wind Speed", "weathersit": "🌤️ Weather",
+    "season": "🍂 Season", "mnth": "🗓️ Month", "yr": "📆 Year", "weekday": "📅 Weekday",
+    "workingday": "💼 Working Day", "holiday": "🎉 Holiday",
+    "prev_day_same_hour": "🔁 Same Hour Yesterday",
+}
+
+def serving_lattice(res):
+    # a lattice scored by another model (older training run, or before a hot swap) would serve stale predictions
+    if lattice is not None and lattice.built_from(res["prediction_cache"].fingerprint):
+        return lattice
+    return None
+
+def _model_outputs(res, quantiles):
+    # compute(sample) -> raw outputs by name: cnt, the segments of segment models and pXX bounds
+    def compute(sample_input):
+        if quantiles:
+            # the same traversal gives the mean, the segments and the spread of the trees
+            parts = utils.predict_intervals(res["explainer"], [sample_input], quantiles,
+                                            plan=res["encoding_plan"], lag_index=res["lag_index"])
+        elif getattr(res["model"], "n_outputs_", 1) == 2:
+            # one encoding pass and one predict give both segments
+            parts = utils.predict_components(res["model"], [sample_input], plan=res["encoding_plan"],
+                                             lag_index=res["lag_index"])
+        else:
+            parts = {"cnt": predict_total(res, [sample_input])}
+        return {k: float(v[0]) for k, v in parts.items()}
+    return compute
+
+def predict_bikes(sample_input, use_lattice=False, quantiles=None):
+    """Rentals for one input as {"prediction", "components", "interval", "lattice"}.
+
+    components holds casual/registered riders for segment models and interval
+    the pXX bounds of the forest's trees (each None when not available);
+    lattice is True when the prediction was interpolated from the lattice.
+    """
+    # RIDEWISE_INSTRUMENT=1 records per-stage timings; RIDEWISE_PROFILE_EVERY=N profiles one call in N
+    result = {"components": None, "interval": None, "lattice": False}
+    with instrument.request('predict_bikes'):
+        res = serving()
+        if use_lattice and serving_lattice(res) is not None and lattice.covers(sample_input):
+            pred = lattice.predict([sample_input])[0]
+            result["lattice"] = True
+        else:
+            t0 = time.perf_counter()
+            # intervals need a forest's per-tree outputs
+            quantiles = quantiles if res["explainer"] is not None else None
+            bounds = [utils.quantile_name(q) for q in quantiles or ()]
+            # models trained with --targets segments predict casual and registered riders jointly
+            segments = utils.SEGMENT_COLS if getattr(res["model"], "n_outputs_", 1) == 2 else []
+            parts = res["prediction_cache"].get_or_compute(sample_input, _model_outputs(res, quantiles),
+                                                           ["cnt"] + segments + bounds)
+            pred = parts["cnt"]
+            if segments:
+                # the total is the sum of the rounded segments
+                result["components"] = {k: max(0, int(round(parts[k]))) for k in segments}
+                pred = sum(result["components"].values())
+            if bounds:
+                result["interval"] = {k: max(0, int(round(parts[k]))) for k in bounds}
+            shadow.submit([sample_input], [pred], time.perf_counter() - t0)
+    loader.first_prediction()
+    result["prediction"] = max(0, int(round(pred)))
+    return result
 
 # -----------------------------
 # UI Config
@@ -365,6 +502,15 @@ with st.sidebar:
         """
     )
     
+    instant_mode = False
+    if lattice is not None:
+        st.markdown('<div class="sidebar-subheader">⚡ Instant Mode</div>', unsafe_allow_html=True)
+        instant_mode = st.toggle("Serve from precomputed lattice", value=False,
+                                 help="Interpolate predictions from a grid precomputed offline. "
+                                      "Used when date inputs match the grid's calendar context and it was built from the served model.")
+        if instant_mode and "accuracy" in lattice.meta:
+            st.caption(f"Lattice MAE vs live model: {lattice.meta['accuracy']['mae']:.1f} rentals")
+
     st.markdown('<hr style="border-top: 1px solid var(--border-color);">', unsafe_allow_html=True)
     st.markdown(
         f'<p style="text-align: center; color: var(--text-muted); font-size: 0.8rem;">Version 1.0</p>', 
@@ -378,6 +524,26 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Readiness of the background model load; polls only until the model is ready
+@st.fragment(run_every=0.5)
+def model_status():
+    status = loader.status()
+    if loader.ready.is_set():
+        st.rerun()  # the full rerun drops this poller and shows the outcome below
+    else:
+        step = "Warming up" if status["stage"] == "warming" else "Loading"
+        st.info(f"⏳ {step} the prediction model in the background ({status['elapsed_s']:.1f}s) - "
+                "the form is ready, predictions start as soon as it finishes.")
+
+if loader.ready.is_set() and loader.error is not None:
+    st.error(f"Model failed to load: {loader.error}")
+elif loader.ready.is_set():
+    version = "" if hot_swap.target == MODELS_DIR else f" {os.path.basename(hot_swap.target)}"
+    st.caption(f"✅ Model{version} ready · cold start {loader.timings['ready_s']:.2f}s "
+               f"(load {loader.timings['load_s']:.2f}s, warm-up {loader.timings.get('warmup_s', 0):.2f}s)")
+else:
+    model_status()
+
 # Options
 months = ["January", "February", "March", "April", "May", "June",
           "July", "August", "September", "October", "November", "December"]
@@ -478,7 +644,8 @@ if submitted:
 
     try:
         # Using a dummy prediction value for the sake of runnable code
-        prediction = predict_bikes(sample_input) 
+        result = predict_bikes(sample_input, use_lattice=instant_mode, quantiles=INTERVAL_QUANTILES)
+        prediction, components, interval = result["prediction"], result["components"], result["interval"]
         
         # Display result with enhanced styling
         st.markdown(f"""
@@ -488,36 +655,194 @@ if submitted:
             <p style="font-size: 1.2rem; margin: 0;">Expected bike rentals for the given conditions</p>
         </div>
         """, unsafe_allow_html=True)
+        if interval:
+            band_col1, band_col2, band_col3 = st.columns(3)
+            band_col1.metric("📉 Low (P10)", interval["p10"])
+            band_col2.metric("📊 Median (P50)", interval["p50"])
+            band_col3.metric("🚲 Fleet sizing (P90)", interval["p90"],
+                             help="9 in 10 of the forest's trees predict at most this many rentals")
+        if components:
+            st.caption(f"🚲 Casual riders: {components['casual']} · Registered riders: {components['registered']}")
+        cache_stats = serving()["prediction_cache"].stats()
+        if result["lattice"]:
+            st.caption("⚡ Served from the precomputed lattice")
+        st.caption(f"⚡ Prediction cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits, "
+                   f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
         
         # Additional insights in expandable section
         with st.expander("📊 Prediction Insights & Input Summary", expanded=True):
-            insight_col1, insight_col2, insight_col3 = st.columns(3)
-            
-            with insight_col1:
-                st.metric("🌡️ Temperature Impact", f"{temp:.2f}", 
-                          help="Higher temperatures generally increase rentals")
-                st.metric("💧 Humidity Level", f"{hum:.2f}", 
-                          help="Lower humidity is better for cycling")
+            res = serving()
+            if res["explainer"] is not None:
+                # what the forest actually used: value changes along this input's decision paths
+                bias, contrib = explain.explain_batch(res["explainer"], [sample_input], res["encoding_plan"],
+                                                      res["lag_index"])
+                contrib = contrib.iloc[0].sort_values(key=abs, ascending=False)
+                st.caption(f"Starting from the model's average of {bias:.0f} rentals, "
+                           "each input moved this prediction by:")
+                insight_cols = st.columns(3)
+                for i, (field, value) in enumerate(contrib.head(6).items()):
+                    with insight_cols[i % 3]:
+                        st.metric(FIELD_LABELS.get(field, field), sample_input.get(field, "history"),
+                                  delta=f"{value:+.0f} rentals")
+                st.bar_chart(contrib.rename(index=FIELD_LABELS))
+            else:
+                insight_col1, insight_col2, insight_col3 = st.columns(3)
             
-            with insight_col2:
-                weather_impact = {1: "Excellent", 2: "Good", 3: "Fair", 4: "Poor"}
-                st.metric("🌤️ Weather Impact", weather_impact[weathersit], 
-                          help="Weather conditions significantly affect demand")
-                st.metric("🌬️ Wind Conditions", f"{windspeed:.2f}", 
-                          help="Lower wind speed is preferred")
+                with insight_col1:
+                    st.metric("🌡️ Temperature Impact", f"{temp:.2f}", 
+                              help="Higher temperatures generally increase rentals")
+                    st.metric("💧 Humidity Level", f"{hum:.2f}", 
+                              help="Lower humidity is better for cycling")
             
-            with insight_col3:
-                time_impact = "Peak" if hr in [7,8,9,17,18,19] else "High" if 10 <= hr <= 16 else "Low"
-                st.metric("⏰ Time Impact", time_impact, 
-                          help="Rush hours and daytime see higher demand")
-                day_impact = "Weekend" if not (workingday == "Yes") else "Weekday"
-                st.metric("📅 Day Type", day_impact, 
-                          help="Weekend vs weekday affects rental patterns")
+                with insight_col2:
+                    weather_impact = {1: "Excellent", 2: "Good", 3: "Fair", 4: "Poor"}
+                    st.metric("🌤️ Weather Impact", weather_impact[weathersit], 
+                              help="Weather conditions significantly affect demand")
+                    st.metric("🌬️ Wind Conditions", f"{windspeed:.2f}", 
+                              help="Lower wind speed is preferred")
             
+                with insight_col3:
+                    time_impact = "Peak" if hr in [7,8,9,17,18,19] else "High" if 10 <= hr <= 16 else "Low"
+                    st.metric("⏰ Time Impact", time_impact, 
+                              help="Rush hours and daytime see higher demand")
+                    day_impact = "Weekend" if not (workingday == "Yes") else "Weekday"
+                    st.metric("📅 Day Type", day_impact, 
+                              help="Weekend vs weekday affects rental patterns")
+
     except Exception as e:
         st.error(f"Error making prediction: {str(e)}")
         st.info("Please check that all model files are properly loaded and input parameters are valid.")
 
+# -----------------------------
+# Demand curve over a horizon
+# -----------------------------
+st.markdown('<div class="section-header">📈 Demand Curve Forecast</div>', unsafe_allow_html=True)
+with st.form("horizon_form"):
+    h_col1, h_col2 = st.columns(2)
+    with h_col1:
+        start_date = st.date_input("📆 Start Date", help="Forecast starts at midnight of this day")
+    with h_col2:
+        horizons = ["Next 24 hours", "Next 7 days"] + (["Next 30 days"] if daily_forecaster else [])
+        horizon = st.radio("⏱️ Horizon", horizons, index=0, horizontal=True,
+                           help="Hourly forecasts over the whole horizon, scored in one batch per day; "
+                                "30 days uses the daily model split into hours by learned profiles")
+    st.caption("Uses the weather conditions selected above for every hour.")
+    horizon_submitted = st.form_submit_button("📈 Forecast Demand Curve")
+
+if horizon_submitted:
+    try:
+        if horizon == "Next 30 days":
+            curve = daily_forecaster.forecast(
+                start_date, days=30,
+                weather={"weathersit": weather_mapping[weather_choice], "temp": temp,
+                         "atemp": atemp, "hum": hum, "windspeed": windspeed})
+            st.bar_chart(curve.attrs["daily"].set_index("date")["total"])
+            st.metric("📅 30-day Total", f"{int(curve.attrs['daily']['total'].sum()):,}")
+        else:
+            res = serving()
+            curve = forecast.forecast_horizon(
+                res["model"], res["encoding_plan"], start_date,
+                hours=24 if horizon == "Next 24 hours" else 168,
+                weather={"weathersit": weather_mapping[weather_choice], "temp": temp,
+                         "atemp": atemp, "hum": hum, "windspeed": windspeed},
+                lag_index=res["lag_index"])
+        st.line_chart(curve.set_index("timestamp")["prediction"])
+        peak = curve.loc[curve["prediction"].idxmax()]
+        st.metric("🔝 Peak Demand", int(peak["prediction"]), help=f"At {peak['timestamp']:%a %H:%M}")
+    except Exception as e:
+        st.error(f"Error forecasting demand curve: {str(e)}")
+
+# -----------------------------
+# Scenario sweep heatmap
+# -----------------------------
+SWEEP_FIELDS = {"temp": "🌡️ Temperature", "atemp": "🤗 Feels Like", "hum": "💧 Humidity",
+                "windspeed": "🌬️ Wind Speed", "weathersit": "🌤️ Weather"}
+
+@st.cache_data(show_spinner=False)
+def scenario_grid(x_field, y_field, resolution, fixed, model_fingerprint):
+    # every hour is swept too, so moving the hour slider never rescores;
+    # model_fingerprint keys the cache so a hot-swapped model never serves the old model's grid
+    axes = {field: [1, 2, 3, 4] if field == "weathersit" else np.linspace(0, 1, resolution)
+            for field in (x_field, y_field)}
+    axes["hr"] = np.arange(24)
+    res = serving()
+    grid = sweep.sweep(axes, fixed, loaded=dict(model=res["model"], plan=res["encoding_plan"],
+                                                lag_index=res["lag_index"]))
+    return {k: np.asarray(v) for k, v in axes.items()}, np.maximum(0, np.rint(grid))
+
+st.markdown('<div class="section-header">🗺️ Scenario Sweep</div>', unsafe_allow_html=True)
+with st.form("sweep_form"):
+    s_col1, s_col2, s_col3 = st.columns(3)
+    with s_col1:
+        x_field = st.selectbox("↔️ X axis", list(SWEEP_FIELDS), index=0, format_func=SWEEP_FIELDS.get)
+    with s_col2:
+        y_field = st.selectbox("↕️ Y axis", list(SWEEP_FIELDS), index=2, format_func=SWEEP_FIELDS.get)
+    with s_col3:
+        resolution = st.slider("🔢 Resolution", 10, 50, 25, help="Steps per axis over 0-1")
+    st.caption("Predicts every combination for all 24 hours; other inputs come from the form above.")
+    sweep_submitted = st.form_submit_button("🗺️ Sweep Scenarios")
+
+if sweep_submitted:
+    st.session_state["sweep_args"] = (x_field, y_field, resolution)
+
+if "sweep_args" in st.session_state:
+    x_field, y_field, resolution = st.session_state["sweep_args"]
+    if x_field == y_field:
+        st.warning("Pick two different fields to sweep.")
+    else:
+        fixed = {
+            "season": ["Spring", "Summer", "Fall", "Winter"].index(season) + 1,
+            "yr": 0 if yr == 2011 else 1, "mnth": months.index(mnth) + 1,
+            "holiday": 1 if holiday == "Yes" else 0, "weekday": weekdays.index(weekday),
+            "workingday": 1 if workingday == "Yes" else 0, "weathersit": weather_mapping[weather_choice],
+            "temp": temp, "atemp": atemp, "hum": hum, "windspeed": windspeed,
+        }
+        fixed = {k: v for k, v in fixed.items() if k not in (x_field, y_field)}
+        if "temp" in (x_field, y_field) and "atemp" not in (x_field, y_field):
+            del fixed["atemp"]  # feels-like follows the swept temperature
+        try:
+            fingerprint = serving()["prediction_cache"].fingerprint
+            with st.spinner("Sweeping scenarios..."):
+                axes, grid = scenario_grid(x_field, y_field, resolution, fixed, fingerprint)
+            sweep_hr = st.slider("⏰ Hour shown", 0, 23, 8, key="sweep_hr")
+            xs, ys = np.meshgrid(axes[x_field], axes[y_field], indexing="ij")
+            heat = pd.DataFrame({x_field: xs.ravel().round(3), y_field: ys.ravel().round(3),
+                                 "rentals": grid[:, :, sweep_hr].ravel()})
+            chart = alt.Chart(heat).mark_rect().encode(
+                x=alt.X(f"{x_field}:O", title=SWEEP_FIELDS[x_field], axis=alt.Axis(labelOverlap=True)),
+                y=alt.Y(f"{y_field}:O", title=SWEEP_FIELDS[y_field], sort="descending",
+                        axis=alt.Axis(labelOverlap=True)),
+                color=alt.Color("rentals:Q", scale=alt.Scale(scheme="viridis")),
+                tooltip=[x_field, y_field, "rentals"])
+            st.altair_chart(chart)
+            best = np.unravel_index(grid[:, :, sweep_hr].argmax(), grid.shape[:2])
+            st.caption(f"{grid.size:,} scenarios scored. Busiest at {sweep_hr}:00: "
+                       f"{SWEEP_FIELDS[x_field]} {axes[x_field][best[0]]:.2f}, "
+                       f"{SWEEP_FIELDS[y_field]} {axes[y_field][best[1]]:.2f} "
+                       f"({int(grid[:, :, sweep_hr].max())} rentals)")
+        except Exception as e:
+            st.error(f"Error sweeping scenarios: {str(e)}")
+
+# Instrumentation panel (only when RIDEWISE_INSTRUMENT is set)
+if instrument.registry.enabled:
+    with st.expander("⏱️ Performance Instrumentation", expanded=False):
+        summary = instrument.registry.summary()
+        if summary:
+            st.dataframe(pd.DataFrame(summary).T.round(3))
+        else:
+            st.caption("No timings recorded yet - make a prediction first.")
+        profiles = instrument.registry.render_profiles()
+        if profiles:
+            st.markdown("**Sampled profiles**")
+            st.code(profiles, language="text")
+        st.markdown("**Startup**")
+        st.json(loader.status())
+        if shadow.candidate.target is not None:
+            st.markdown("**Shadow scoring**")
+            st.json(shadow.summary())
+        st.markdown("**Metrics dump**")
+        st.code(instrument.registry.render(), language="text")
+
 # Footer
 st.markdown("""
 <br><br>
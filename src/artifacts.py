@@ -0,0 +1,56 @@
+# src/artifacts.py
+# Load the files train_model.py writes, for serving code outside Streamlit.
+import os
+import joblib
+import numpy as np
+import utils
+import instrument
+import explain
+from forest_export import FlatForest
+
+def load_model(models_dir):
+    """Prefer the flat export (mmap, shared across processes); fall back to the joblib pickle."""
+    flat_dir = os.path.join(models_dir, 'bike_model_flat')
+    if os.path.isdir(flat_dir):
+        return FlatForest.load(flat_dir)
+    return joblib.load(os.path.join(models_dir, 'bike_model.pkl'))
+
+def load_artifacts(models_dir, data_path=None):
+    """Return model, feature_columns, encoding plan and lag index (None if unavailable)."""
+    with instrument.stage('load_model'):
+        model = load_model(models_dir)
+    feature_columns = joblib.load(os.path.join(models_dir, 'feature_columns.pkl'))
+    plan_path = os.path.join(models_dir, 'encoding_plan.json')
+    if os.path.exists(plan_path):
+        plan = utils.load_encoding_plan(plan_path)
+    else:
+        plan = utils.compile_encoding_plan(feature_columns)
+    lag_path = os.path.join(models_dir, 'lag_index.npz')
+    if os.path.exists(lag_path):
+        lag_index = utils.LagIndex.load(lag_path)
+    elif data_path and os.path.exists(data_path):
+        lag_index = utils.LagIndex.from_csv(data_path)
+    else:
+        lag_index = None
+    return model, feature_columns, plan, lag_index
+
+# per-process artifacts of a pool worker, filled once by init_worker
+worker = {}
+
+def init_worker(models_dir, data_path=None, quantiles=None):
+    """ProcessPoolExecutor initializer: load model, plan and lag_index once per worker into `worker`.
+
+    The flat forest is memory-mapped, so every worker shares the same pages.
+    With quantiles, the model is flattened for per-tree outputs (a pickled
+    forest once per worker) and the quantiles are kept alongside.
+    """
+    model, _, plan, lag_index = load_artifacts(models_dir, data_path)
+    if quantiles:
+        model = explain.as_flat(model)
+        if model is None:
+            raise ValueError("Quantiles need a random forest model")
+    worker.update(model=model, plan=plan, lag_index=lag_index, quantiles=quantiles)
+
+def to_counts(preds):
+    """Round raw predictions to non-negative rental counts, as predict_bikes does."""
+    return np.maximum(0, np.rint(preds)).astype(int)
@@ -0,0 +1,101 @@
+# src/batch_score.py
+# Score large CSV/Parquet files in the hour.csv schema with a process pool sharing one mmap'd model.
+import argparse
+import os
+import resource
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import utils
+import artifacts
+import streaming
+import validation
+
+# input columns copied through to the output next to the prediction
+ID_COLS = ['instant', 'dteday', 'hr']
+
+def iter_input_chunks(path, chunksize):
+    """Yield DataFrame chunks from a CSV or Parquet file without reading it whole."""
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        # compact ints only: float32 weather values would shift the derived features
+        dtypes = {c: t for c, t in streaming.HOUR_DTYPES.items()
+                  if c in header and np.dtype(t).kind == 'i'}
+        yield from pd.read_csv(path, dtype=dtypes, chunksize=chunksize)
+
+def _score_chunk(chunk):
+    worker = artifacts.worker
+    out = chunk[[c for c in ID_COLS if c in chunk.columns]].copy()
+    if worker['quantiles']:
+        preds = utils.predict_intervals(worker['model'], chunk, worker['quantiles'], plan=worker['plan'],
+                                        lag_index=worker['lag_index'])
+        out['prediction'] = artifacts.to_counts(preds.pop('cnt'))
+        for name in utils.SEGMENT_COLS:
+            preds.pop(name, None)
+        for name, bound in preds.items():
+            out[name] = artifacts.to_counts(bound)
+        return out
+    preds = utils.predict_batch(worker['model'], chunk, plan=worker['plan'], lag_index=worker['lag_index'])
+    out['prediction'] = artifacts.to_counts(preds)
+    return out
+
+def peak_rss_mb():
+    """Peak RSS of this process and of the largest finished worker (Linux reports KB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return own / 1024, children / 1024
+
+def score_file(in_path, out_path, models_dir, data_path=None, chunksize=50_000, n_jobs=-1, quantiles=None):
+    """Stream in_path through the pool and append predictions to out_path in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded by
+    the chunk size rather than the file size. With quantiles, each row also
+    gets pXX columns from the spread of the forest's trees.
+    """
+    workers = validation.total_cores(n_jobs)
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    t0 = time.perf_counter()
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=artifacts.init_worker,
+                             initargs=(models_dir, data_path, quantiles)) as pool:
+        in_flight = deque()
+
+        def write_oldest():
+            scored = in_flight.popleft().result()
+            scored.to_csv(out_path, mode='a', header=not os.path.exists(out_path), index=False)
+            return len(scored)
+
+        for chunk in iter_input_chunks(in_path, chunksize):
+            in_flight.append(pool.submit(_score_chunk, chunk))
+            if len(in_flight) >= 2 * workers:
+                rows += write_oldest()
+        while in_flight:
+            rows += write_oldest()
+
+    elapsed = time.perf_counter() - t0
+    own_mb, worker_mb = peak_rss_mb()
+    print(f"Scored {rows:,} rows with {workers} workers in {elapsed:.2f}s "
+          f"({rows / elapsed:,.0f} rows/s); peak RSS {own_mb:.0f} MB main, {worker_mb:.0f} MB worker")
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_sec': rows / elapsed,
+            'peak_rss_mb': own_mb, 'peak_worker_rss_mb': worker_mb}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--in_path", required=True, help="CSV or .parquet file in the hour.csv schema")
+    parser.add_argument("--out_path", required=True, help="CSV to write predictions to")
+    parser.add_argument("--models_dir", default="../models", help="Directory with the trained artifacts")
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Used to build the lag index if not exported")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Rows per chunk sent to a worker")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Worker processes (-1: all cores)")
+    parser.add_argument("--quantiles", default=None,
+                        help="Comma separated quantiles of the per-tree predictions to add, e.g. 0.1,0.9")
+    args = parser.parse_args()
+    score_file(args.in_path, args.out_path, args.models_dir, args.data_path, args.chunksize, args.n_jobs,
+               [float(q) for q in args.quantiles.split(",")] if args.quantiles else None)
@@ -0,0 +1,199 @@
+# src/bench.py
+# Reproducible timings of the train and serve hot paths on synthetic data scaled up from hour.csv.
+# Writes JSON and can compare against a stored baseline, exiting non-zero past a regression threshold.
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+import utils
+import forest_export
+import train_model
+from bench_encode import RAW_FIELDS
+
+WEATHER_COLS = ['temp', 'atemp', 'hum', 'windspeed']
+# small fixed forest so every run times the same model
+BENCH_FOREST = {'n_estimators': 50, 'max_depth': 20, 'min_samples_leaf': 2, 'random_state': 0}
+
+def synthetic_hours(data_path, scale=4, seed=0):
+    """hour.csv repeated `scale` times on later dates, with jittered weather and counts."""
+    base = pd.read_csv(data_path)
+    base['dteday'] = pd.to_datetime(base['dteday'])
+    span = base['dteday'].max() - base['dteday'].min() + pd.Timedelta(days=1)
+    rng = np.random.default_rng(seed)
+    parts = []
+    for k in range(scale):
+        part = base.copy()
+        part['dteday'] = part['dteday'] + k * span
+        if k:
+            noise = rng.normal(0, 0.02, (len(part), len(WEATHER_COLS)))
+            part[WEATHER_COLS] = np.clip(part[WEATHER_COLS].to_numpy() + noise, 0, 1)
+            part['cnt'] = np.maximum(0, part['cnt'] + rng.integers(-10, 11, len(part)))
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    df['instant'] = np.arange(1, len(df) + 1)
+    return df
+
+def time_call(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+def run(data_path, scale=4, repeats=5, seed=0, only=None):
+    """Time every case and return {'meta': ..., 'results': {case: timings}}."""
+    raw = synthetic_hours(data_path, scale, seed)
+    engineered = utils.feature_engineer(raw.copy())
+    lagged = utils.add_lag_features(engineered.copy())
+    X, y, feature_columns = utils.build_feature_matrix(lagged)
+    plan = utils.compile_encoding_plan(feature_columns)
+    rng = np.random.default_rng(seed)
+    sample = raw.iloc[int(rng.integers(len(raw)))][RAW_FIELDS].to_dict()
+    X_batch = X.to_numpy(dtype=np.float32)[rng.integers(0, len(X), 10_000)]
+    samples = raw.iloc[rng.integers(0, len(raw), 1000)][RAW_FIELDS].to_dict('records')
+
+    model = RandomForestRegressor(n_jobs=1, **BENCH_FOREST).fit(X.to_numpy(dtype=np.float32), y)
+    tmp = tempfile.mkdtemp(prefix='ridewise_bench_')
+    model_path, flat_dir = os.path.join(tmp, 'bike_model.pkl'), os.path.join(tmp, 'bike_model_flat')
+    joblib.dump(model, model_path)
+    forest_export.export_forest(model, flat_dir)
+    flat = forest_export.FlatForest.load(flat_dir)
+    # same forest settings fitted on casual/registered, for the fused segment path
+    segment_flat = forest_export.FlatForest.from_model(
+        RandomForestRegressor(n_jobs=1, **BENCH_FOREST).fit(X.to_numpy(dtype=np.float32), lagged[utils.SEGMENT_COLS]))
+    csv_path = os.path.join(tmp, 'hour.csv')
+    raw.assign(dteday=raw['dteday'].dt.strftime('%Y-%m-%d')).to_csv(csv_path, index=False)
+
+    def train_e2e():
+        X_t, y_t = train_model.load_training_matrix(csv_path)[:2]
+        RandomForestRegressor(n_jobs=1, **BENCH_FOREST).fit(X_t, y_t)
+
+    # name -> (callable, rows processed per call, repeats)
+    cases = {
+        'feature_engineer': (lambda: utils.feature_engineer(raw.copy()), len(raw), repeats),
+        'add_lag_features': (lambda: utils.add_lag_features(engineered.copy()), len(raw), repeats),
+        'build_feature_matrix': (lambda: utils.build_feature_matrix(lagged), len(raw), repeats),
+        'build_feature_matrix_compact': (lambda: utils.build_feature_matrix_compact(raw.copy()), len(raw), repeats),
+        'prepare_input_df': (lambda: utils.prepare_input_df(sample, feature_columns, plan), 1, repeats * 20),
+        'predict_single_sklearn': (lambda: model.predict(X_batch[:1]), 1, repeats * 20),
+        'predict_single_flat': (lambda: flat.predict(X_batch[:1]), 1, repeats * 20),
+        'predict_batch_sklearn': (lambda: model.predict(X_batch), len(X_batch), repeats),
+        'predict_batch_flat': (lambda: flat.predict(X_batch), len(X_batch), repeats),
+        'serve_single_cnt': (lambda: utils.predict_batch(flat, [sample], plan=plan), 1, repeats * 20),
+        'serve_single_segments': (lambda: utils.predict_components(segment_flat, [sample], plan=plan),
+                                  1, repeats * 20),
+        'serve_batch_cnt': (lambda: utils.predict_batch(flat, samples, plan=plan), len(samples), repeats),
+        'serve_batch_segments': (lambda: utils.predict_components(segment_flat, samples, plan=plan),
+                                 len(samples), repeats),
+        'serve_single_intervals': (lambda: utils.predict_intervals(flat, [sample], (0.1, 0.5, 0.9), plan=plan),
+                                   1, repeats * 20),
+        'serve_batch_intervals': (lambda: utils.predict_intervals(flat, samples, (0.1, 0.5, 0.9), plan=plan),
+                                  len(samples), repeats),
+        'explain_batch_flat': (lambda: flat.contributions(X_batch), len(X_batch), repeats),
+        'load_model_pickle': (lambda: joblib.load(model_path), 1, repeats),
+        'load_model_flat': (lambda: forest_export.FlatForest.load(flat_dir), 1, repeats),
+        'train_end_to_end': (train_e2e, len(raw), max(1, repeats // 2)),
+    }
+    results = {}
+    for name, (fn, rows, n) in cases.items():
+        if only and name not in only:
+            continue
+        fn()  # warm-up
+        times = time_call(fn, n)
+        median = float(np.median(times))
+        results[name] = {'median_s': median, 'min_s': float(min(times)), 'repeats': n,
+                         'rows': rows, 'rows_per_s': rows / median}
+        print(f"{name:<30}{median * 1000:>12.3f} ms  {rows / median:>14,.0f} rows/s")
+    shutil.rmtree(tmp)
+
+    meta = {'scale': scale, 'rows': len(raw), 'seed': seed, 'repeats': repeats,
+            'python': platform.python_version(), 'numpy': np.__version__,
+            'pandas': pd.__version__, 'sklearn': sklearn.__version__,
+            'cpu_count': os.cpu_count(), 'machine': platform.machine()}
+    return {'meta': meta, 'results': results}
+
+def memory_comparison(data_path, scale=4, seed=0):
+    """Peak traced memory of load_training_matrix with and without compact=True on the synthetic data."""
+    raw = synthetic_hours(data_path, scale, seed)
+    tmp = tempfile.mkdtemp(prefix='ridewise_bench_')
+    csv_path = os.path.join(tmp, 'hour.csv')
+    raw.assign(dteday=raw['dteday'].dt.strftime('%Y-%m-%d')).to_csv(csv_path, index=False)
+    del raw
+    report, matrices = {}, {}
+    for name, compact in [('pandas_pipeline', False), ('compact_inplace', True)]:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        X = train_model.load_training_matrix(csv_path, compact=compact)[0]
+        elapsed = time.perf_counter() - t0
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        matrices[name] = np.asarray(X, dtype=np.float32)
+        report[name] = {'peak_mb': peak / 1e6, 'retained_mb': current / 1e6, 'seconds': elapsed}
+        print(f"{name:<18} peak {peak / 1e6:>8.1f} MB  retained {current / 1e6:>8.1f} MB  {elapsed:.2f}s")
+        del X
+    shutil.rmtree(tmp)
+    X_ref, X_new = matrices['pandas_pipeline'], matrices['compact_inplace']
+    report['matrix_bytes_mb'] = X_new.nbytes / 1e6
+    report['max_abs_diff'] = float(np.abs(X_ref - X_new).max())
+    report['peak_ratio'] = report['pandas_pipeline']['peak_mb'] / report['compact_inplace']['peak_mb']
+    print(f"Encoded matrix {report['matrix_bytes_mb']:.1f} MB; compact peak is "
+          f"{report['peak_ratio']:.1f}x lower; max abs difference {report['max_abs_diff']:.2g}")
+    return report
+
+def compare(current, baseline, threshold=0.10):
+    """Print the change per case against a baseline; return the cases slower by more than threshold."""
+    regressions = []
+    print(f"{'case':<30}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<30}{'-':>14}{cur['median_s'] * 1000:>14.3f}{'new':>10}")
+            continue
+        change = cur['median_s'] / base['median_s'] - 1
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f"{name:<30}{base['median_s'] * 1000:>14.3f}{cur['median_s'] * 1000:>14.3f}{change:>+10.1%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Path to CSV dataset the synthetic data is built from")
+    parser.add_argument("--scale", type=int, default=4, help="Copies of hour.csv in the synthetic dataset")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case (single-row cases run 20x more)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic data and sampled inputs")
+    parser.add_argument("--only", default=None, help="Comma separated subset of cases to run")
+    parser.add_argument("--memory", action="store_true",
+                        help="Also compare peak memory of the pandas and compact in-place feature pipelines")
+    parser.add_argument("--out", default="../models/bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=None, help="JSON results from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+    results = run(args.data_path, args.scale, args.repeats, args.seed,
+                  args.only.split(",") if args.only else None)
+    if args.memory:
+        results['memory'] = memory_comparison(args.data_path, args.scale, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=1)
+    print("Saved benchmark results to", args.out)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}:",
+                  ", ".join(regressions))
+            sys.exit(1)
+        print("No regressions past", f"{args.threshold:.0%}")
@@ -0,0 +1,64 @@
+# src/cache.py
+# Binary cache of the encoded training matrix, keyed by the source CSV and the feature code.
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import utils
+import streaming
+
+# modules whose source decides what the encoded matrix looks like
+FEATURE_MODULES = [utils, streaming]
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def feature_code_hash():
+    h = hashlib.sha256()
+    for module in FEATURE_MODULES:
+        with open(module.__file__, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def cache_key(data_path, variant=''):
+    h = hashlib.sha256((file_hash(data_path) + feature_code_hash() + variant).encode())
+    return h.hexdigest()[:16]
+
+def load(entry_dir):
+    """Memory-map a cache entry: X, y, feature_columns and the lag index."""
+    X = np.load(os.path.join(entry_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, 'y.npy'), mmap_mode='r')
+    with open(os.path.join(entry_dir, 'columns.json')) as f:
+        feature_columns = pd.Index(json.load(f))
+    lag_index = utils.LagIndex.load(os.path.join(entry_dir, 'lag_index.npz'))
+    return X, y, feature_columns, lag_index
+
+def load_or_build(data_path, cache_dir, build, variant=''):
+    """Return the cached matrix for data_path, calling build(entry_dir) on a miss.
+
+    build must write X.npy and y.npy into the directory it is given and return
+    (feature_columns, lag_index). `variant` separates encodings of the same
+    data (e.g. per engine). Entries are written to a temporary directory and
+    renamed into place, so a crashed build never leaves a half entry.
+    """
+    entry_dir = os.path.join(cache_dir, cache_key(data_path, variant))
+    if os.path.exists(entry_dir):
+        print("Dataset cache hit:", entry_dir)
+        return load(entry_dir)
+
+    print("Dataset cache miss, building:", entry_dir)
+    tmp_dir = entry_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    feature_columns, lag_index = build(tmp_dir)
+    with open(os.path.join(tmp_dir, 'columns.json'), 'w') as f:
+        json.dump([str(c) for c in feature_columns], f)
+    lag_index.save(os.path.join(tmp_dir, 'lag_index.npz'))
+    os.replace(tmp_dir, entry_dir)
+    return load(entry_dir)
@@ -0,0 +1,225 @@
+# src/daily.py
+# Daily-total model on day.csv plus hourly profiles that split daily totals into hours.
+# One predict call covers a month; the hourly forest is only needed where both levels are reconciled.
+import argparse
+import json
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+import utils
+import forecast
+import artifacts
+
+# day.csv has no hour, so the hour-derived columns are left out
+DAY_COLUMNS = ['season', 'yr', 'mnth', 'holiday', 'weekday', 'workingday', 'weathersit',
+               'temp', 'atemp', 'hum', 'windspeed', 'temp_feels_like', 'weather_comfort', 'is_weekend']
+DAY_PARAMS = {'n_estimators': 300, 'min_samples_leaf': 2, 'max_features': 0.8}
+
+def day_grid(start, days=30, weather=None, holidays=()):
+    """Columnar daily inputs for `days` consecutive days from start (weather as in forecast.horizon_grid)."""
+    dates = pd.date_range(pd.Timestamp(start).normalize(), periods=days, freq='D')
+    cols = utils.calendar_fields(dates.values, holidays)
+    weather = dict(forecast.DEFAULT_WEATHER, **(weather or {}))
+    for field in forecast.WEATHER_FIELDS:
+        cols[field] = np.broadcast_to(np.asarray(weather[field], dtype=np.float64), (days,)).copy()
+    return dates, cols
+
+def learn_profiles(hour_df):
+    """Mean share of the day's count per hour, keyed by (weekday, workingday, season).
+
+    Returns a (7, 2, 4, 24) array whose rows sum to 1. Combinations the data
+    never shows (e.g. a Sunday working day) fall back to the weekday's profile.
+    """
+    days = utils._as_days(hour_df['dteday'].to_numpy())
+    _, day_idx = np.unique(days, return_inverse=True)
+    cnt = hour_df['cnt'].to_numpy(dtype=np.float64)
+    totals = np.bincount(day_idx, weights=cnt)
+    share = cnt / totals[day_idx]
+    key = (hour_df['weekday'].to_numpy(), hour_df['workingday'].to_numpy(), hour_df['season'].to_numpy() - 1)
+    sums = np.zeros((7, 2, 4, 24))
+    np.add.at(sums, key + (hour_df['hr'].to_numpy(),), share)
+    first_row = np.unique(day_idx, return_index=True)[1]
+    day_key = np.zeros((7, 2, 4))
+    np.add.at(day_key, tuple(k[first_row] for k in key), 1)
+    profiles = sums / np.maximum(day_key, 1)[..., None]
+    seen = day_key > 0
+    weekday_mean = sums.sum(axis=(1, 2)) / np.maximum(day_key.sum(axis=(1, 2)), 1)[:, None]
+    profiles[~seen] = np.broadcast_to(weekday_mean[:, None, None, :], profiles.shape)[~seen]
+    return profiles / profiles.sum(axis=-1, keepdims=True)
+
+def disaggregate(totals, cols, profiles):
+    """Split daily totals into a (n_days, 24) matrix with the matching hourly profile."""
+    idx = (np.asarray(cols['weekday'], dtype=np.int64), np.asarray(cols['workingday'], dtype=np.int64),
+           np.asarray(cols['season'], dtype=np.int64) - 1)
+    return np.asarray(totals, dtype=np.float64)[:, None] * profiles[idx]
+
+def reconcile(hourly, daily_totals, daily_weight=0.5):
+    """Make both levels agree: scale each day's hourly curve to a blend of the two totals.
+
+    hourly is (n_days, 24) from the hourly model. Returns the reconciled hourly
+    matrix and the per-day totals it sums to.
+    """
+    hourly = np.maximum(hourly, 0)
+    sums = hourly.sum(axis=1)
+    target = daily_weight * np.asarray(daily_totals, dtype=np.float64) + (1 - daily_weight) * sums
+    scale = np.divide(target, sums, out=np.ones_like(target), where=sums > 0)
+    return hourly * scale[:, None], target
+
+class DailyForecaster:
+    """Daily model, its encoding plan and the hourly profiles, as saved by train_daily."""
+
+    def __init__(self, model, plan, profiles):
+        self.model = model
+        self.plan = plan
+        self.profiles = profiles
+
+    @classmethod
+    def load(cls, path):
+        return cls(joblib.load(os.path.join(path, 'daily_model.pkl')),
+                   utils.load_encoding_plan(os.path.join(path, 'daily_plan.json')),
+                   np.load(os.path.join(path, 'hour_profiles.npy')))
+
+    def predict_totals(self, cols):
+        return np.maximum(utils.predict_batch(self.model, cols, plan=self.plan), 0)
+
+    def forecast(self, start, days=30, weather=None, holidays=(), hourly_model=None, daily_weight=0.5):
+        """Hourly DataFrame for `days` days from start, plus its daily totals in attrs['daily'].
+
+        Without hourly_model the curve is the daily prediction split by profile
+        (one predict call). With hourly_model=(model, plan, lag_index) the hourly
+        forecast is also run and both levels are reconciled.
+        """
+        dates, cols = day_grid(start, days, weather, holidays)
+        totals = self.predict_totals(cols)
+        if hourly_model is None:
+            hourly, reconciled = disaggregate(totals, cols, self.profiles), totals
+        else:
+            model, plan, lag_index = hourly_model
+            curve = forecast.forecast_horizon(model, plan, dates[0], hours=24 * days, weather=weather,
+                                              lag_index=lag_index, holidays=holidays)
+            hourly, reconciled = reconcile(curve['prediction'].to_numpy().reshape(days, 24), totals, daily_weight)
+        ts = pd.date_range(dates[0], periods=24 * days, freq='h')
+        result = pd.DataFrame({'timestamp': ts, 'hr': ts.hour,
+                               'prediction': np.rint(hourly.ravel()).astype(int)})
+        result.attrs['daily'] = pd.DataFrame({'date': dates, 'daily_model': totals, 'total': reconciled})
+        return result
+
+def daily_frame(day_path):
+    df = pd.read_csv(day_path)
+    df['dteday'] = pd.to_datetime(df['dteday'])
+    return df
+
+def train_daily(day_path, hour_path, out_dir, holdout_days=60, random_state=42, n_jobs=-1):
+    """Fit the daily model on day.csv and the hourly profiles on hour.csv; save both to out_dir.
+
+    The last holdout_days days are scored first by a model fitted on the rest;
+    the saved model is then refit on every day.
+    """
+    df = daily_frame(day_path)
+    plan = utils.compile_encoding_plan(DAY_COLUMNS)
+    X = utils.encode_batch(df, plan=plan)
+    y = df['cnt'].to_numpy(dtype=np.float64)
+    model = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **DAY_PARAMS)
+    split = len(df) - holdout_days
+    model.fit(X[:split], y[:split])
+    preds = model.predict(X[split:])
+    metrics = {'holdout_days': holdout_days, 'r2': r2_score(y[split:], preds),
+               'mae': mean_absolute_error(y[split:], preds)}
+    print(f"Daily model on the last {holdout_days} days: R2 {metrics['r2']:.4f}, MAE {metrics['mae']:.1f}")
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    metrics['fit_seconds'] = time.perf_counter() - t0
+
+    profiles = learn_profiles(pd.read_csv(hour_path))
+    os.makedirs(out_dir, exist_ok=True)
+    joblib.dump(model, os.path.join(out_dir, 'daily_model.pkl'))
+    utils.save_encoding_plan(plan, os.path.join(out_dir, 'daily_plan.json'))
+    np.save(os.path.join(out_dir, 'hour_profiles.npy'), profiles)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(metrics, f, indent=1)
+    print("Saved daily model, plan and hourly profiles to", out_dir)
+    return DailyForecaster(model, plan, profiles)
+
+def benchmark(day_path, hour_path, models_dir, days=30, random_state=42):
+    """Backtest the last `days` days: hourly-only chained forecast vs daily + profiles vs reconciled.
+
+    The daily model is refit on the days before the window and the lag index
+    is cut at its start, so both paths forecast ahead. The hourly forest is
+    the saved one and may have seen these days in training.
+    """
+    day_df = daily_frame(day_path)
+    hour_df = pd.read_csv(hour_path)
+    window = day_df.iloc[-days:]
+    start = window['dteday'].iloc[0]
+    train = day_df.iloc[:-days]
+    plan = utils.compile_encoding_plan(DAY_COLUMNS)
+    model = RandomForestRegressor(random_state=random_state, n_jobs=-1, **DAY_PARAMS)
+    model.fit(utils.encode_batch(train, plan=plan), train['cnt'].to_numpy(dtype=np.float64))
+    hour_days = utils._as_days(hour_df['dteday'].to_numpy())
+    daily = DailyForecaster(model, plan, learn_profiles(hour_df[hour_days < np.datetime64(start, 'D')]))
+
+    hourly_model, _, hourly_plan, lag_index = artifacts.load_artifacts(models_dir, hour_path)
+    history = (np.datetime64(start, 'D') - lag_index.start).astype(np.int64)
+    lag_index = utils.LagIndex(lag_index.start, lag_index.counts[:history])
+    holidays = window.loc[window['holiday'] == 1, 'dteday'].to_numpy()
+
+    # per-hour weather for the hourly path, per-day weather for the daily path
+    in_window = hour_days >= np.datetime64(start, 'D')
+    grid = pd.DataFrame({'dteday': np.repeat(window['dteday'].to_numpy(), 24), 'hr': np.tile(np.arange(24), days)})
+    hours = grid.merge(hour_df[in_window].assign(dteday=hour_days[in_window].astype('datetime64[ns]')),
+                       on=['dteday', 'hr'], how='left')
+    hours[forecast.WEATHER_FIELDS] = hours[forecast.WEATHER_FIELDS].ffill().bfill()
+    actual = hours['cnt'].fillna(0).to_numpy().reshape(days, 24)
+    hour_weather = {f: hours[f].to_numpy() for f in forecast.WEATHER_FIELDS}
+    day_weather = {f: window[f].to_numpy() for f in forecast.WEATHER_FIELDS}
+
+    t0 = time.perf_counter()
+    curve = forecast.forecast_horizon(hourly_model, hourly_plan, start, hours=24 * days,
+                                      weather=hour_weather, lag_index=lag_index, holidays=holidays)
+    hourly_s = time.perf_counter() - t0
+    hourly = curve['prediction'].to_numpy(dtype=np.float64).reshape(days, 24)
+
+    t0 = time.perf_counter()
+    _, cols = day_grid(start, days, day_weather, holidays)
+    totals = daily.predict_totals(cols)
+    split = disaggregate(totals, cols, daily.profiles)
+    daily_s = time.perf_counter() - t0
+    reconciled, _ = reconcile(hourly, totals)
+
+    def scores(pred):
+        return {'daily_mae': mean_absolute_error(window['cnt'], pred.sum(axis=1)),
+                'hourly_mae': mean_absolute_error(actual.ravel(), pred.ravel())}
+
+    report = {
+        'days': days,
+        'hourly_only': dict(scores(hourly), seconds=hourly_s, predict_calls=curve.attrs['predict_calls']),
+        'daily_profiles': dict(scores(split), seconds=daily_s, predict_calls=1),
+        'reconciled': dict(scores(reconciled), seconds=hourly_s + daily_s,
+                           predict_calls=curve.attrs['predict_calls'] + 1),
+    }
+    print(f"{days}-day backtest from {start:%Y-%m-%d}:")
+    print(f"{'path':<16}{'seconds':>10}{'calls':>8}{'daily MAE':>12}{'hourly MAE':>12}")
+    for name in ['hourly_only', 'daily_profiles', 'reconciled']:
+        r = report[name]
+        print(f"{name:<16}{r['seconds']:>10.3f}{r['predict_calls']:>8}{r['daily_mae']:>12.1f}{r['hourly_mae']:>12.1f}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--day_path", default="../data/day.csv", help="Daily dataset")
+    parser.add_argument("--hour_path", default="../data/hour.csv", help="Hourly dataset the profiles are learned from")
+    parser.add_argument("--out_dir", default="../models/daily", help="Where to save the daily model and profiles")
+    parser.add_argument("--holdout_days", type=int, default=60, help="Trailing days scored before the final refit")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Backtest month-long forecasts against the hourly-only approach")
+    parser.add_argument("--models_dir", default="../models", help="Hourly model artifacts for --benchmark")
+    parser.add_argument("--days", type=int, default=30, help="Backtest length for --benchmark")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.day_path, args.hour_path, args.models_dir, args.days)
+    else:
+        train_daily(args.day_path, args.hour_path, args.out_dir, args.holdout_days)
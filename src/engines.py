@@ -0,0 +1,48 @@
+# src/engines.py
+# Estimator registry for train_model --engine: each engine brings its estimator, search space and encoding.
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+import utils
+
+RF_PARAM_DIST = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [10, 20, None],
+    'min_samples_split': [2, 5, 10],
+    'min_samples_leaf': [1, 2, 4],
+    'max_features': ['sqrt', 'log2', 0.8],
+    'bootstrap': [True, False]
+}
+
+HGB_PARAM_DIST = {
+    'max_iter': [200, 400, 800],
+    'learning_rate': [0.03, 0.1, 0.2],
+    'max_leaf_nodes': [15, 31, 63],
+    'min_samples_leaf': [10, 20, 40],
+    'l2_regularization': [0.0, 0.1, 1.0],
+    'max_depth': [None, 8],
+}
+
+def make_rf(random_state, n_jobs, feature_columns):
+    return RandomForestRegressor(random_state=random_state, n_jobs=n_jobs)
+
+def make_hgb(random_state, n_jobs, feature_columns):
+    # no n_jobs: train_model caps its OpenMP threads to the share instead ('n_jobs': False below)
+    # season/weathersit stay single integer-coded columns and split natively as categories
+    categorical = [str(c) in utils.ONE_HOT_COLS for c in feature_columns]
+    return HistGradientBoostingRegressor(categorical_features=categorical, random_state=random_state)
+
+# one_hot: whether season/weathersit are one-hot encoded or passed through as category codes
+# resource / max_resource: what successive halving grows, and up to how much
+# n_jobs: whether the estimator takes an n_jobs share of the core budget, or has its threads capped to it
+# multi_output: whether one model can fit the casual/registered segments jointly
+ENGINES = {
+    'rf': {'make': make_rf, 'param_dist': RF_PARAM_DIST, 'one_hot': True,
+           'resource': 'n_estimators', 'max_resource': 300, 'n_jobs': True, 'multi_output': True},
+    'hgb': {'make': make_hgb, 'param_dist': HGB_PARAM_DIST, 'one_hot': False,
+            'resource': 'max_iter', 'max_resource': 810, 'n_jobs': False, 'multi_output': False},
+}
+
+def engine_plan(name):
+    """Encoding plan an engine trains on; None lets build_feature_matrix discover one-hot levels."""
+    if ENGINES[name]['one_hot']:
+        return None
+    return utils.compile_encoding_plan(utils.encoded_column_names(one_hot=False))
@@ -0,0 +1,48 @@
+# src/explain.py
+# Per-prediction explanations from the forest's own decision paths (FlatForest.contributions).
+import numpy as np
+import pandas as pd
+import utils
+from forest_export import FlatForest
+
+def as_flat(model):
+    """FlatForest for a flat export or a fitted RandomForest; None for models without trees to walk."""
+    if isinstance(model, FlatForest):
+        return model
+    if hasattr(model, 'estimators_') and hasattr(model.estimators_[0], 'tree_'):
+        return FlatForest.from_model(model)
+    return None
+
+def input_weights(plan):
+    """(n_columns, n_inputs) matrix crediting each model column to the raw fields it is built from.
+
+    One-hot levels and hour encodings go wholly to their source field; columns
+    derived from several fields (temp_feels_like, weather_comfort) are split
+    evenly between them.
+    """
+    sources = [spec['source'] if isinstance(spec['source'], list) else [spec['source']]
+               for spec in plan['columns']]
+    inputs = list(dict.fromkeys(f for src in sources for f in src))
+    W = np.zeros((len(sources), len(inputs)))
+    for j, src in enumerate(sources):
+        for field in src:
+            W[j, inputs.index(field)] = 1 / len(src)
+    return W, inputs
+
+def explain_batch(forest, samples, plan, lag_index=None, by_input=True):
+    """Contributions for N samples as a DataFrame, one column per input field (or model column).
+
+    Also returns the bias (the forest's mean prediction); bias plus a row's
+    contributions is that row's prediction. Segment models are explained on
+    their total (casual + registered).
+    """
+    X = utils.encode_batch(samples, plan=plan, lag_index=lag_index)
+    bias, contrib = forest.contributions(X)
+    if contrib.ndim == 3:
+        bias, contrib = bias.sum(), contrib.sum(axis=2)
+    if by_input:
+        W, names = input_weights(plan)
+        contrib = contrib @ W
+    else:
+        names = [spec['name'] for spec in plan['columns']]
+    return float(bias), pd.DataFrame(contrib, columns=names)
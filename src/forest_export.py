@@ -0,0 +1,213 @@
+# src/forest_export.py
+# Flatten a fitted RandomForestRegressor into contiguous NumPy arrays and score it without sklearn.
+import argparse
+import json
+import os
+import shutil
+import time
+import multiprocessing as mp
+import numpy as np
+
+ARRAYS = ['feature', 'threshold', 'left', 'right', 'value', 'roots']
+FORMAT_VERSION = 1
+
+def flatten_forest(model):
+    """Concatenate every tree's nodes into flat arrays with global node ids.
+
+    Leaves are rewritten to loop onto themselves (feature 0, threshold +inf,
+    left = right = self), so traversal can run a fixed number of steps for all
+    trees and rows at once without masking finished paths.
+    """
+    trees = [est.tree_ for est in model.estimators_]
+    sizes = np.array([t.node_count for t in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+    feature = np.concatenate([t.feature for t in trees]).astype(np.int32)
+    threshold = np.concatenate([t.threshold for t in trees]).astype(np.float64)
+    left = np.concatenate([t.children_left + r for t, r in zip(trees, roots)]).astype(np.int32)
+    right = np.concatenate([t.children_right + r for t, r in zip(trees, roots)]).astype(np.int32)
+    # regression trees store the node mean as value[:, output, 0]
+    value = np.concatenate([t.value[:, :, 0] for t in trees]).astype(np.float32)
+
+    is_leaf = np.concatenate([t.children_left == -1 for t in trees])
+    node_ids = np.arange(len(feature), dtype=np.int32)
+    feature[is_leaf] = 0
+    threshold[is_leaf] = np.inf
+    left[is_leaf] = node_ids[is_leaf]
+    right[is_leaf] = node_ids[is_leaf]
+
+    arrays = dict(feature=feature, threshold=threshold, left=left, right=right, value=value, roots=roots)
+    meta = {
+        'version': FORMAT_VERSION,
+        'n_features': int(model.n_features_in_),
+        'n_outputs': int(value.shape[1]),
+        'n_trees': len(trees),
+        'max_depth': int(max(t.max_depth for t in trees)),
+        'feature_names': [str(c) for c in getattr(model, 'feature_names_in_', [])],
+    }
+    return arrays, meta
+
+def export_forest(model, out_dir):
+    """Write the flattened forest as one .npy per array plus meta.json.
+
+    The files are written to a sibling temporary directory that is then
+    renamed over out_dir. Rewriting the .npy files in place would change the
+    pages every process that memory-mapped the previous export is reading;
+    after the swap those processes keep the old (unlinked) files until they
+    reload.
+    """
+    arrays, meta = flatten_forest(model)
+    out_dir = out_dir.rstrip(os.sep)
+    suffix = f'{os.getpid()}-{time.time_ns()}'
+    tmp_dir = f'{out_dir}.tmp-{suffix}'
+    os.makedirs(tmp_dir)
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), arr)
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    # a directory can only be renamed onto an empty one, so move the old export aside first
+    old_dir = f'{out_dir}.old-{suffix}'
+    if os.path.isdir(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return out_dir
+
+class FlatForest:
+    """Pure-NumPy forest predictor over the arrays written by export_forest.
+
+    Loaded with mmap the arrays are shared read-only pages, so every worker
+    process mapping the same directory uses one copy in the page cache.
+    """
+
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.n_features_in_ = meta['n_features']
+        self.n_outputs_ = meta['n_outputs']
+        self.max_depth = meta['max_depth']
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported flat forest version {meta.get('version')!r} in {path}")
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in ARRAYS}
+        return cls(arrays, meta)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(*flatten_forest(model))
+
+    def apply(self, X):
+        """Leaf node id reached in every tree: shape (n_trees, n_rows)."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def predict_trees(self, X, batch_size=4096):
+        """Per-tree predictions, shape (n_trees, n_rows[, n_outputs])."""
+        out = []
+        for start in range(0, len(X), batch_size):
+            out.append(self.value[self.apply(X[start:start + batch_size])])
+        per_tree = np.concatenate(out, axis=1) if out else np.empty((len(self.roots), 0, self.n_outputs_))
+        return per_tree[..., 0] if self.n_outputs_ == 1 else per_tree
+
+    def predict(self, X, batch_size=4096):
+        return self.predict_trees(X, batch_size).mean(axis=0)
+
+    def contributions(self, X, batch_size=4096):
+        """Per-feature contributions along each row's decision paths, in the same traversal as apply.
+
+        Every split's value change (child mean - node mean) is credited to the
+        feature it tested and averaged over trees, so for each row
+        bias + contributions.sum(axis=1) equals predict(X). Returns bias, shape
+        (n_outputs,), and contributions, shape (n_rows, n_features[, n_outputs]).
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_rows, n_features = len(X), self.n_features_in_
+        bias = self.value[self.roots].mean(axis=0).astype(np.float64)
+        contrib = np.zeros((n_rows, n_features, self.n_outputs_))
+        for start in range(0, n_rows, batch_size):
+            Xb = X[start:start + batch_size]
+            rows = np.arange(len(Xb))
+            node = np.repeat(self.roots[:, None], len(Xb), axis=1)
+            # flat (row, feature) slot per tree/row; bincount sums all trees at once
+            cell_base = rows * n_features
+            acc = np.zeros((len(Xb) * n_features, self.n_outputs_))
+            for _ in range(self.max_depth):
+                feat = self.feature[node]
+                go_left = Xb[rows, feat] <= self.threshold[node]
+                nxt = np.where(go_left, self.left[node], self.right[node])
+                # leaves loop onto themselves, so finished paths add zero
+                delta = self.value[nxt] - self.value[node]
+                cells = (cell_base + feat).ravel()
+                for k in range(self.n_outputs_):
+                    acc[:, k] += np.bincount(cells, weights=delta[..., k].ravel(), minlength=len(acc))
+                node = nxt
+            contrib[start:start + len(Xb)] = acc.reshape(len(Xb), n_features, -1)
+        contrib /= len(self.roots)
+        if self.n_outputs_ == 1:
+            return bias[0], contrib[..., 0]
+        return bias, contrib
+
+def _rss_kb():
+    # current resident set size, Linux first and peak RSS elsewhere
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _measure(kind, path, X, queue):
+    import joblib  # noqa: F401  (import cost excluded from the load timing)
+    rss0 = _rss_kb()
+    t0 = time.perf_counter()
+    model = joblib.load(path) if kind == 'joblib' else FlatForest.load(path)
+    load_time = time.perf_counter() - t0
+    model.predict(X[:1])  # first call faults in the pages it touches
+    t0 = time.perf_counter()
+    preds = model.predict(X)
+    rate = len(X) / (time.perf_counter() - t0)
+    queue.put({'load_s': load_time, 'rss_mb': (_rss_kb() - rss0) / 1024, 'rows_per_s': rate, 'preds': preds})
+
+def report(model_path, flat_dir, X):
+    """Load and score each artifact in a fresh process and print load time, RSS growth and rows/sec."""
+    ctx = mp.get_context('spawn')
+    results = {}
+    for kind, path in [('joblib', model_path), ('flat', flat_dir)]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_measure, args=(kind, path, X, queue))
+        proc.start()
+        results[kind] = queue.get()
+        proc.join()
+    diff = np.abs(results['joblib']['preds'] - results['flat']['preds']).max()
+    for kind, r in results.items():
+        print(f"{kind:>6}: load {r['load_s'] * 1000:8.1f} ms  RSS +{r['rss_mb']:7.1f} MB  "
+              f"{r['rows_per_s']:>12,.0f} rows/s")
+    print(f"max |joblib - flat| prediction difference: {diff:.2e}")
+    return results
+
+if __name__ == "__main__":
+    import joblib
+    import train_model
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model_path", default="../models/bike_model.pkl", help="Trained joblib model")
+    parser.add_argument("--flat_out", default="../models/bike_model_flat", help="Directory for the flattened forest")
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Rows to score for the report")
+    parser.add_argument("--report", action="store_true", help="Compare load time, RSS and rows/sec with joblib")
+    args = parser.parse_args()
+    export_forest(joblib.load(args.model_path), args.flat_out)
+    print("Saved flat forest to", args.flat_out)
+    if args.report:
+        X = np.asarray(train_model.load_training_matrix(args.data_path)[0], dtype=np.float32)
+        report(args.model_path, args.flat_out, X)
@@ -0,0 +1,189 @@
+# src/instrument.py
+# Opt-in per-stage timing histograms for the prediction path, with cProfile/tracemalloc sampling.
+# Off by default; enable() or RIDEWISE_INSTRUMENT=1 switches it on. Disabled stages cost one attribute check.
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+# upper bounds in seconds, Prometheus style; the last bucket catches everything else
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float('inf'))
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for the open bucket)."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class _Stage:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.t0)
+
+class _Null:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NULL = _Null()
+
+class _Request:
+    """Times a whole request and, for one request in sample_every, profiles it."""
+
+    def __init__(self, registry, name, profile):
+        self.registry = registry
+        self.name = name
+        self.profile = profile
+
+    def __enter__(self):
+        if self.profile == 'cprofile':
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.profile == 'tracemalloc':
+            tracemalloc.start()
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        self.registry.observe(self.name, elapsed)
+        if self.profile == 'cprofile':
+            self.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(15)
+            self.registry.add_profile(self.name, 'cprofile', elapsed, out.getvalue())
+        elif self.profile == 'tracemalloc':
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top = snapshot.statistics('lineno')[:15]
+            text = f"peak {peak / 1024:.1f} KiB\n" + '\n'.join(str(s) for s in top)
+            self.registry.add_profile(self.name, 'tracemalloc', elapsed, text)
+        if self.profile:
+            self.registry.profiling = False
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self.sample_every = 0
+        self.profiler = 'cprofile'
+        self.histograms = {}
+        self.profiles = deque(maxlen=10)
+        self.requests = 0
+        self.profiling = False
+        self.lock = threading.Lock()
+
+    def enable(self, sample_every=0, profiler='cprofile'):
+        """Start recording; with sample_every=N one request in N is also profiled."""
+        self.enabled = True
+        self.sample_every = sample_every
+        self.profiler = profiler
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.profiles.clear()
+            self.requests = 0
+
+    def observe(self, name, seconds):
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].observe(seconds)
+
+    def add_profile(self, name, kind, seconds, text):
+        with self.lock:
+            self.profiles.append({'stage': name, 'kind': kind, 'seconds': seconds,
+                                  'time': time.time(), 'text': text})
+
+    def stage(self, name):
+        """Context manager timing one stage into its histogram."""
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def request(self, name='request'):
+        """Like stage(), but also counts requests and profiles one in sample_every."""
+        if not self.enabled:
+            return _NULL
+        profile = None
+        with self.lock:
+            self.requests += 1
+            # both profilers are process-wide, so never run two samples at once
+            if self.sample_every and self.requests % self.sample_every == 0 and not self.profiling:
+                profile = self.profiler
+                self.profiling = True
+        return _Request(self, name, profile)
+
+    def summary(self):
+        """Per-stage count, mean and p50/p90/p99/max in milliseconds."""
+        with self.lock:
+            return {name: {'count': h.count, 'mean_ms': h.sum / h.count * 1000,
+                           'p50_ms': h.quantile(0.5) * 1000, 'p90_ms': h.quantile(0.9) * 1000,
+                           'p99_ms': h.quantile(0.99) * 1000, 'max_ms': h.max * 1000}
+                    for name, h in self.histograms.items() if h.count}
+
+    def render(self):
+        """Prometheus-style text dump of every stage histogram."""
+        lines = []
+        with self.lock:
+            for name, h in self.histograms.items():
+                seen = 0
+                for bound, n in zip(BUCKETS, h.counts):
+                    seen += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'ridewise_stage_seconds_bucket{{stage="{name}",le="{le}"}} {seen}')
+                lines.append(f'ridewise_stage_seconds_sum{{stage="{name}"}} {h.sum}')
+                lines.append(f'ridewise_stage_seconds_count{{stage="{name}"}} {h.count}')
+            lines.append(f'ridewise_profiled_requests {len(self.profiles)}')
+        return '\n'.join(lines) + '\n'
+
+    def render_profiles(self):
+        """The most recent sampled profiles as plain text, newest first."""
+        with self.lock:
+            profiles = list(self.profiles)[::-1]
+        return ''.join(f"== {p['kind']} of {p['stage']} ({p['seconds'] * 1000:.2f} ms) "
+                       f"at {time.strftime('%H:%M:%S', time.localtime(p['time']))} ==\n{p['text']}\n"
+                       for p in profiles)
+
+registry = Registry()
+stage = registry.stage
+request = registry.request
+
+if os.environ.get('RIDEWISE_INSTRUMENT'):
+    registry.enable(int(os.environ.get('RIDEWISE_PROFILE_EVERY', '0')),
+                    os.environ.get('RIDEWISE_PROFILER', 'cprofile'))
@@ -0,0 +1,153 @@
+# src/lattice.py
+# Precomputed prediction lattice over the UI's weather inputs, answered by lookup + interpolation.
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import utils
+import artifacts
+import validation
+from pred_cache import artifact_fingerprint
+
+# discrete axes are looked up exactly; continuous axes are interpolated multilinearly
+DISCRETE_AXES = ['hr', 'weathersit']
+CONTINUOUS_AXES = ['temp', 'atemp', 'hum', 'windspeed']
+# calendar fields held fixed for one lattice (the app's default inputs)
+DEFAULT_CONTEXT = {'season': 1, 'yr': 0, 'mnth': 1, 'holiday': 0, 'weekday': 0, 'workingday': 0}
+
+def lattice_axes(step=0.1):
+    axes = {'hr': np.arange(24), 'weathersit': np.arange(1, 5)}
+    grid = np.round(np.linspace(0, 1, int(round(1 / step)) + 1), 6)
+    axes.update({name: grid for name in CONTINUOUS_AXES})
+    return axes
+
+def _score_hour(args):
+    hr, axes, context = args
+    names = ['weathersit'] + CONTINUOUS_AXES
+    mesh = np.meshgrid(*[axes[n] for n in names], indexing='ij')
+    cols = {n: m.ravel().astype(np.float64) for n, m in zip(names, mesh)}
+    n = len(cols['temp'])
+    cols['hr'] = np.full(n, hr, dtype=np.float64)
+    cols.update({k: np.full(n, v, dtype=np.float64) for k, v in context.items()})
+    worker = artifacts.worker
+    preds = utils.predict_batch(worker['model'], cols, plan=worker['plan'], lag_index=worker['lag_index'])
+    return hr, preds.astype(np.float32).reshape(mesh[0].shape)
+
+def build_lattice(models_dir, out_dir, context=None, step=0.1, data_path=None, n_jobs=-1):
+    """Score the model on every lattice point, one hour per pool task, into out_dir/lattice.npy."""
+    context = dict(DEFAULT_CONTEXT, **(context or {}))
+    axes = lattice_axes(step)
+    shape = tuple(len(axes[n]) for n in DISCRETE_AXES + CONTINUOUS_AXES)
+    os.makedirs(out_dir, exist_ok=True)
+    tensor = np.lib.format.open_memmap(os.path.join(out_dir, 'lattice.npy'), mode='w+',
+                                       dtype=np.float32, shape=shape)
+    workers = validation.total_cores(n_jobs)
+    tasks = [(hr, axes, context) for hr in axes['hr']]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=artifacts.init_worker,
+                             initargs=(models_dir, data_path)) as pool:
+        for hr, block in pool.map(_score_hour, tasks):
+            tensor[hr] = block
+    tensor.flush()
+    model_path = os.path.join(models_dir, 'bike_model_flat')
+    if not os.path.isdir(model_path):
+        model_path = os.path.join(models_dir, 'bike_model.pkl')
+    meta = {
+        'axes': {n: axes[n].tolist() for n in DISCRETE_AXES + CONTINUOUS_AXES},
+        'context': context,
+        'model': os.path.basename(model_path),
+        # lets a server tell whether the lattice came from the model it is serving
+        'model_fingerprint': artifact_fingerprint(model_path),
+        'build_s': time.perf_counter() - t0,
+        'points': int(np.prod(shape)),
+    }
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    print(f"Built {meta['points']:,} lattice points with {workers} workers in {meta['build_s']:.1f}s")
+    return Lattice.load(out_dir)
+
+class Lattice:
+    """Memory-mapped prediction lattice for one calendar context."""
+
+    def __init__(self, tensor, meta):
+        self.tensor = tensor
+        self.meta = meta
+        self.context = meta['context']
+        self.axes = {n: np.asarray(v) for n, v in meta['axes'].items()}
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(np.load(os.path.join(path, 'lattice.npy'), mmap_mode='r'), meta)
+
+    def built_from(self, fingerprint):
+        """True when the lattice was scored by the model with this artifact fingerprint."""
+        return self.meta.get('model_fingerprint') == fingerprint
+
+    def covers(self, sample):
+        """True when the sample's calendar fields match the lattice context."""
+        if 'dteday' in sample or 'prev_day_same_hour' in sample:
+            return False
+        if not 0 <= sample.get('hr', -1) < 24:
+            return False
+        return all(int(sample.get(k, -1)) == v for k, v in self.context.items())
+
+    def predict(self, samples):
+        """Multilinear interpolation over the continuous axes for N samples."""
+        cols = utils._as_columns(samples)
+        hr = cols['hr'].astype(np.int64)
+        weather = np.searchsorted(self.axes['weathersit'], cols['weathersit'].astype(np.int64))
+        lo, frac = [], []
+        for name in CONTINUOUS_AXES:
+            grid = self.axes[name]
+            x = np.clip(cols[name].astype(np.float64), grid[0], grid[-1])
+            i = np.clip(np.searchsorted(grid, x, side='right') - 1, 0, len(grid) - 2)
+            lo.append(i)
+            frac.append((x - grid[i]) / (grid[i + 1] - grid[i]))
+        out = np.zeros(len(hr))
+        for corner in range(1 << len(CONTINUOUS_AXES)):
+            bits = [(corner >> d) & 1 for d in range(len(CONTINUOUS_AXES))]
+            weight = np.ones(len(hr))
+            idx = [hr, weather]
+            for d, b in enumerate(bits):
+                weight *= frac[d] if b else 1 - frac[d]
+                idx.append(lo[d] + b)
+            out += weight * self.tensor[tuple(idx)]
+        return out
+
+def accuracy_report(lattice, models_dir, data_path=None, n=2000, seed=0):
+    """Compare lattice and live predictions on random slider-quantized inputs."""
+    rng = np.random.default_rng(seed)
+    cols = {name: np.round(rng.uniform(0, 1, n), 2) for name in CONTINUOUS_AXES}
+    cols['hr'] = rng.integers(0, 24, n).astype(np.float64)
+    cols['weathersit'] = rng.integers(1, 5, n).astype(np.float64)
+    cols.update({k: np.full(n, v, dtype=np.float64) for k, v in lattice.context.items()})
+    model, _, plan, lag_index = artifacts.load_artifacts(models_dir, data_path)
+    live = utils.predict_batch(model, dict(cols), plan=plan, lag_index=lag_index)
+    approx = lattice.predict(cols)
+    err = np.abs(approx - live)
+    report = {'samples': n, 'mae': float(err.mean()), 'p99_abs_err': float(np.percentile(err, 99)),
+              'max_abs_err': float(err.max()), 'mean_prediction': float(live.mean())}
+    print(f"Lattice vs live on {n} points: MAE {report['mae']:.2f}, p99 {report['p99_abs_err']:.2f}, "
+          f"max {report['max_abs_err']:.2f} (mean prediction {report['mean_prediction']:.1f})")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models_dir", default="../models", help="Directory with the trained artifacts")
+    parser.add_argument("--out_dir", default="../models/lattice", help="Where to write lattice.npy and meta.json")
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Used to build the lag index if not exported")
+    parser.add_argument("--step", type=float, default=0.1, help="Grid step for temp/atemp/hum/windspeed")
+    parser.add_argument("--context", default="{}", help="JSON overrides for the fixed calendar fields")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Worker processes (-1: all cores)")
+    args = parser.parse_args()
+    lat = build_lattice(args.models_dir, args.out_dir, json.loads(args.context), args.step,
+                        args.data_path, args.n_jobs)
+    with open(os.path.join(args.out_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    meta['accuracy'] = accuracy_report(lat, args.models_dir, args.data_path)
+    with open(os.path.join(args.out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
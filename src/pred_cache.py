@@ -0,0 +1,129 @@
+# src/pred_cache.py
+# Bounded LRU cache of predictions keyed on quantized inputs, with an optional shared SQLite tier.
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from cache import file_hash
+
+# fields that identify a prediction, in key order; floats are rounded to the UI slider step
+KEY_FIELDS = ['season', 'yr', 'mnth', 'holiday', 'weekday', 'workingday', 'weathersit',
+              'temp', 'atemp', 'hum', 'windspeed', 'hr', 'dteday', 'prev_day_same_hour']
+FLOAT_DECIMALS = 2
+
+def canonical_key(sample):
+    """Quantized, order-independent key for a sample dict."""
+    parts = []
+    for field in KEY_FIELDS:
+        v = sample.get(field)
+        if isinstance(v, float):
+            v = round(v, FLOAT_DECIMALS)
+            v = int(v) if v.is_integer() else v
+        parts.append('' if v is None else str(v))
+    return '|'.join(parts)
+
+def artifact_fingerprint(path):
+    """Hash of a model file, or of every file in a flat export directory."""
+    if os.path.isdir(path):
+        names = sorted(os.listdir(path))
+        digest = ''.join(n + file_hash(os.path.join(path, n)) for n in names)
+        return hashlib.sha256(digest.encode()).hexdigest()[:16]
+    return file_hash(path)[:16]
+
+class PredictionCache:
+    """LRU of sample key -> prediction for one model fingerprint.
+
+    With disk_path, misses fall through to a SQLite table shared by every
+    process using the same file; rows from other fingerprints are dropped when
+    the cache opens, so a new model never serves stale predictions.
+    """
+
+    def __init__(self, fingerprint, maxsize=4096, disk_path=None):
+        self.fingerprint = fingerprint
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+        self.db = None
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self.db.execute('CREATE TABLE IF NOT EXISTS predictions '
+                            '(model TEXT, key TEXT, value REAL, PRIMARY KEY (model, key))')
+            self.db.execute('DELETE FROM predictions WHERE model != ?', (fingerprint,))
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        """Values for keys, counted as one lookup: a hit only when every key is cached."""
+        with self.lock:
+            values, from_disk = [], False
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    values.append(self.entries[key])
+                    continue
+                row = None
+                if self.db is not None:
+                    row = self.db.execute('SELECT value FROM predictions WHERE model = ? AND key = ?',
+                                          (self.fingerprint, key)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return [None] * len(keys)
+                from_disk = True
+                self._remember(key, row[0])
+                values.append(row[0])
+            if from_disk:
+                self.disk_hits += 1
+            else:
+                self.hits += 1
+            return values
+
+    def put(self, key, value):
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)',
+                                (self.fingerprint, key, value))
+
+    def _remember(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(self, sample, compute, names=None):
+        """Cached prediction for sample, calling compute(sample) on a miss.
+
+        With names, compute returns {name: value} (e.g. cnt and its interval
+        bounds) and each value is cached under the sample key plus its name;
+        missing any of them recomputes them all.
+        """
+        key = canonical_key(sample)
+        if names is None:
+            value = self.get(key)
+            if value is None:
+                value = compute(sample)
+                self.put(key, value)
+            return value
+        keys = [f'{key}|{name}' for name in names]
+        values = self.get_many(keys)
+        if values[0] is None:
+            computed = compute(sample)
+            values = [computed[name] for name in names]
+            for k, v in zip(keys, values):
+                self.put(k, v)
+        return dict(zip(names, values))
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,280 @@
+# src/registry.py
+# Versioned model directories with a LIVE/CANDIDATE pointer, hot swapping between them and shadow scoring.
+import argparse
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+from cache import file_hash, feature_code_hash
+
+POINTERS = ('LIVE', 'CANDIDATE')
+
+class ModelRegistry:
+    """Artifacts of every trained model under root/v0001, root/v0002, ...
+
+    Each version directory holds the files train_model.py writes (same names
+    as ../models, so artifacts.load_artifacts reads it directly) plus
+    metadata.json. root/LIVE names the served version and root/CANDIDATE an
+    optional one to shadow-score; both are replaced atomically, so readers
+    never see a half-written pointer or version.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if d.startswith('v') and d[1:].isdigit())
+
+    def path(self, version):
+        return os.path.join(self.root, version)
+
+    def metadata(self, version):
+        with open(os.path.join(self.path(version), 'metadata.json')) as f:
+            return json.load(f)
+
+    def publish(self, files, metadata, promote='live'):
+        """Copy {name in the version dir: source path} into a new version; returns its name.
+
+        The version is assembled in a temporary directory and renamed into
+        place, then optionally pointed at by LIVE or CANDIDATE.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f'.tmp-{os.getpid()}-{time.time_ns()}')
+        os.makedirs(tmp)
+        for name, src in files.items():
+            if src is None or not os.path.exists(src):
+                continue
+            if os.path.isdir(src):
+                shutil.copytree(src, os.path.join(tmp, name))
+            else:
+                shutil.copy2(src, os.path.join(tmp, name))
+        while True:
+            existing = self.versions()
+            version = f"v{int(existing[-1][1:]) + 1 if existing else 1:04d}"
+            with open(os.path.join(tmp, 'metadata.json'), 'w') as f:
+                json.dump(dict(metadata, version=version, created=time.time(),
+                               files=sorted(os.listdir(tmp))), f, indent=1, default=str)
+            try:
+                os.rename(tmp, self.path(version))
+                break
+            except OSError:
+                # another publisher took this number first
+                if not os.path.isdir(self.path(version)):
+                    raise
+        if promote:
+            self.set_pointer(promote.upper(), version)
+        return version
+
+    def pointer(self, name='LIVE'):
+        try:
+            with open(os.path.join(self.root, name)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def set_pointer(self, name, version):
+        """Point LIVE or CANDIDATE at version (None clears it)."""
+        if name not in POINTERS:
+            raise ValueError(f"Unknown pointer {name!r}; expected one of {POINTERS}")
+        path = os.path.join(self.root, name)
+        if version is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        if not os.path.isdir(self.path(version)):
+            raise ValueError(f"No version {version!r} in {self.root}")
+        tmp = f'{path}.tmp-{os.getpid()}'
+        with open(tmp, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp, path)
+
+    def live_dir(self):
+        version = self.pointer('LIVE')
+        return self.path(version) if version else None
+
+    def candidate_dir(self):
+        version = self.pointer('CANDIDATE')
+        return self.path(version) if version else None
+
+def training_metadata(meta_path, data_path, plan_path=None):
+    """Registry metadata for a training run: train_meta.json plus data, plan and feature-code hashes."""
+    meta = {}
+    if meta_path and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    meta['data_path'] = os.path.abspath(data_path)
+    meta['data_hash'] = file_hash(data_path)
+    meta['feature_code_hash'] = feature_code_hash()
+    if plan_path and os.path.exists(plan_path):
+        with open(plan_path) as f:
+            plan = json.load(f)
+        meta['plan_hash'] = file_hash(plan_path)
+        meta['plan_columns'] = [spec['name'] for spec in plan['columns']]
+    return meta
+
+class HotSwap:
+    """Keeps serving one model directory until the pointer names another that is loaded and warm.
+
+    pointer() returns a directory (or None); make_loader(dir) returns a started
+    warmup.BackgroundLoader. check() is cheap and meant to be called per
+    request: at most every poll_s it re-reads the pointer and starts loading a
+    new target in the background; the swap is a single reference assignment
+    once that loader is ready. A version that fails to load is reported and
+    skipped, and the previous one keeps serving.
+    """
+
+    def __init__(self, pointer, make_loader, poll_s=2.0):
+        self.pointer = pointer
+        self.make_loader = make_loader
+        self.poll_s = poll_s
+        self.target = pointer()
+        self.loader = make_loader(self.target) if self.target else None
+        self.pending = None
+        self.pending_target = None
+        self.failed = None
+        self.swaps = 0
+        self.last_poll = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def check(self):
+        """The loader to serve from (None when the pointer is empty)."""
+        now = time.perf_counter()
+        if now - self.last_poll < self.poll_s and self.pending is None:
+            return self.loader
+        with self.lock:
+            if now - self.last_poll >= self.poll_s:
+                self.last_poll = now
+                target = self.pointer()
+                if target == self.target:
+                    # pointer moved back before the pending load finished
+                    self.pending, self.pending_target = None, None
+                elif target != self.pending_target and target != self.failed:
+                    if target is None:
+                        self._swap(None, None)
+                    else:
+                        self.pending, self.pending_target = self.make_loader(target), target
+            if self.pending is not None and self.pending.ready.is_set():
+                if self.pending.error is None:
+                    self._swap(self.pending, self.pending_target)
+                else:
+                    print(f"Not swapping to {self.pending_target}: {self.pending.error}")
+                    self.failed = self.pending_target
+                    self.pending, self.pending_target = None, None
+        return self.loader
+
+    def _swap(self, loader, target):
+        print(f"Swapped model {self.target} -> {target}")
+        self.loader, self.target = loader, target
+        self.pending, self.pending_target = None, None
+        self.swaps += 1
+
+class ShadowScorer:
+    """Re-scores live requests with a candidate model on a background thread.
+
+    submit() only enqueues, so live latency grows by the cost of a queue put;
+    when the queue is full the request is dropped from the comparison rather
+    than slowing live traffic. score(resources, samples) must return the
+    candidate's predictions comparable to the live ones. Divergence and the
+    candidate's latency relative to live are summarised by summary() and, with
+    log_path, appended per request as JSON lines.
+    """
+
+    def __init__(self, candidate, score, log_path=None, maxsize=1000, window=10000):
+        self.candidate = candidate
+        self.score = score
+        self.log_path = log_path
+        self.queue = queue.Queue(maxsize)
+        self.abs_diffs = []
+        self.added_ms = []
+        self.window = window
+        self.scored = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.submit_seconds = 0.0
+        self.submitted = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self._run, name='shadow-scorer', daemon=True).start()
+
+    def submit(self, samples, live_preds, live_seconds):
+        t0 = time.perf_counter()
+        try:
+            self.queue.put_nowait((samples, np.asarray(live_preds, dtype=np.float64), live_seconds))
+        except queue.Full:
+            self.dropped += 1
+        self.submit_seconds += time.perf_counter() - t0
+        self.submitted += 1
+
+    def _run(self):
+        while True:
+            samples, live, live_seconds = self.queue.get()
+            loader = self.candidate.check()
+            if loader is None or not loader.ready.is_set() or loader.error is not None:
+                self.skipped += 1
+                continue
+            try:
+                t0 = time.perf_counter()
+                shadow = np.asarray(self.score(loader.resources, samples), dtype=np.float64)
+                shadow_seconds = time.perf_counter() - t0
+            except Exception as e:
+                print(f"Shadow scoring with {self.candidate.target} failed: {e}")
+                self.skipped += 1
+                continue
+            diff = np.abs(shadow - live)
+            added_ms = (shadow_seconds - live_seconds) * 1000
+            with self.lock:
+                self.scored += 1
+                self.abs_diffs.extend(diff.tolist())
+                self.added_ms.append(added_ms)
+                del self.abs_diffs[:-self.window], self.added_ms[:-self.window]
+            if self.log_path:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps({'time': time.time(), 'candidate': self.candidate.target,
+                                        'rows': len(diff), 'mean_abs_diff': float(diff.mean()),
+                                        'max_abs_diff': float(diff.max()), 'live_ms': live_seconds * 1000,
+                                        'shadow_ms': shadow_seconds * 1000}) + '\n')
+
+    def summary(self):
+        with self.lock:
+            diffs, added = np.array(self.abs_diffs), np.array(self.added_ms)
+        out = {'candidate': self.candidate.target, 'scored': self.scored, 'dropped': self.dropped,
+               'skipped': self.skipped,
+               'submit_overhead_us': self.submit_seconds / self.submitted * 1e6 if self.submitted else 0.0}
+        if len(diffs):
+            out.update(mean_abs_diff=float(diffs.mean()), p90_abs_diff=float(np.percentile(diffs, 90)),
+                       max_abs_diff=float(diffs.max()),
+                       added_latency_p50_ms=float(np.percentile(added, 50)),
+                       added_latency_p99_ms=float(np.percentile(added, 99)))
+        return out
+
+    def render(self):
+        return ''.join(f'ridewise_shadow_{k} {v}\n' for k, v in self.summary().items()
+                       if isinstance(v, (int, float)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registry_dir", default="../models/registry", help="Registry root written by train_model.py")
+    parser.add_argument("--promote", default=None, help="Point LIVE at this version (servers swap to it once warm)")
+    parser.add_argument("--candidate", default=None, help="Point CANDIDATE at this version for shadow scoring")
+    parser.add_argument("--clear_candidate", action="store_true", help="Stop shadow scoring")
+    args = parser.parse_args()
+    reg = ModelRegistry(args.registry_dir)
+    if args.promote:
+        reg.set_pointer('LIVE', args.promote)
+    if args.candidate:
+        reg.set_pointer('CANDIDATE', args.candidate)
+    if args.clear_candidate:
+        reg.set_pointer('CANDIDATE', None)
+    live, candidate = reg.pointer('LIVE'), reg.pointer('CANDIDATE')
+    for version in reg.versions():
+        meta = reg.metadata(version)
+        metrics = meta.get('metrics', {})
+        role = 'LIVE' if version == live else 'CANDIDATE' if version == candidate else ''
+        print(f"{version:<8}{role:<11}{meta.get('engine', '?'):<5}"
+              f"R2 {metrics.get('r2', float('nan')):.4f}  MAE {metrics.get('mae', float('nan')):7.2f}  "
+              f"data {meta.get('data_hash', '?')[:12]}  "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created']))}")
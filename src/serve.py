@@ -0,0 +1,287 @@
+# src/serve.py
+# Headless HTTP/JSON prediction server: concurrent requests are coalesced into one model.predict.
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+import numpy as np
+import utils
+import artifacts
+import instrument
+import registry
+import explain
+import warmup
+
+class Metrics:
+    """Request counters plus a sliding window of latencies for percentiles."""
+
+    def __init__(self, window=10000):
+        self.started = time.perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+
+    def observe(self, latency, rows):
+        self.latencies.append(latency)
+        self.requests += 1
+        self.rows += rows
+
+    def snapshot(self):
+        lat = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        uptime = time.perf_counter() - self.started
+        return {
+            'requests': self.requests,
+            'rows': self.rows,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0,
+            'latency_p50_ms': float(np.percentile(lat, 50)),
+            'latency_p99_ms': float(np.percentile(lat, 99)),
+            'requests_per_sec': self.requests / uptime,
+            'rows_per_sec': self.rows / uptime,
+            'uptime_s': uptime,
+        }
+
+    def render(self):
+        return ''.join(f'ridewise_{k} {v}\n' for k, v in self.snapshot().items())
+
+class MicroBatcher:
+    """Queue samples from many requests and score them together.
+
+    A batch is flushed once it holds max_batch rows or max_wait seconds have
+    passed since its first request arrived. Scoring runs in the default
+    executor so the event loop keeps accepting connections meanwhile. If a
+    batch fails, its requests are rescored one by one so only the bad ones
+    get the error.
+    """
+
+    def __init__(self, predict, max_batch=64, max_wait=0.005, metrics=None):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = metrics or Metrics()
+        self.queue = asyncio.Queue()
+
+    async def submit(self, samples):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((samples, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n_rows = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n_rows += len(item[0])
+            await self._flush(loop, pending)
+
+    async def _flush(self, loop, pending):
+        samples = [s for batch, _ in pending for s in batch]
+        try:
+            preds = await loop.run_in_executor(None, self.predict, samples)
+        except Exception as e:
+            if len(pending) == 1:
+                # the waiting request reports the failure (and counts it) itself
+                pending[0][1].set_exception(e)
+                return
+            # one bad request must not fail the others batched with it
+            for item in pending:
+                await self._flush(loop, [item])
+            return
+        self.metrics.batches += 1
+        start = 0
+        for batch, future in pending:
+            part = slice(start, start + len(batch))
+            # segment models return a dict of per-component arrays
+            future.set_result({k: v[part] for k, v in preds.items()} if isinstance(preds, dict) else preds[part])
+            start += len(batch)
+
+class PredictionServer:
+    def __init__(self, batcher, live=None, shadow=None):
+        self.batcher = batcher
+        self.metrics = batcher.metrics
+        self.live = live
+        self.shadow = shadow
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, content_type, payload = await self.route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                    f'Content-Length: {len(payload)}\r\n'
+                    f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if method == 'GET' and path == '/health':
+            health = {'status': 'ok'}
+            if self.live is not None:
+                health.update(model=self.live.target, swaps=self.live.swaps)
+            if self.shadow is not None:
+                health['shadow'] = self.shadow.summary()
+            return '200 OK', 'application/json', json.dumps(health).encode()
+        if method == 'GET' and path == '/metrics':
+            text = self.metrics.render() + instrument.registry.render()
+            if self.live is not None:
+                text += f'ridewise_model_swaps {self.live.swaps}\n'
+            if self.shadow is not None:
+                text += self.shadow.render()
+            return '200 OK', 'text/plain', text.encode()
+        if method == 'GET' and path == '/profiles':
+            return '200 OK', 'text/plain', instrument.registry.render_profiles().encode()
+        if method == 'POST' and path == '/predict':
+            return await self.predict(body)
+        return '404 Not Found', 'application/json', b'{"error": "not found"}'
+
+    async def predict(self, body):
+        """Body is one sample object, or {"instances": [sample, ...]}."""
+        t0 = time.perf_counter()
+        try:
+            request = json.loads(body)
+            single = 'instances' not in request
+            samples = [request] if single else request['instances']
+            if not samples:
+                raise ValueError("'instances' is empty")
+            preds = await self.batcher.submit(samples)
+        except Exception as e:
+            self.metrics.errors += 1
+            return '400 Bad Request', 'application/json', json.dumps({'error': str(e)}).encode()
+        self.metrics.observe(time.perf_counter() - t0, len(samples))
+        if isinstance(preds, dict):
+            # segment model: rounded components, and their sum as the prediction
+            parts = {k: artifacts.to_counts(preds[k]) for k in utils.SEGMENT_COLS if k in preds}
+            counts = (sum(parts.values()) if parts else artifacts.to_counts(preds['cnt'])).tolist()
+            result = {'prediction': counts[0]} if single else {'predictions': counts}
+            if parts:
+                components = [dict(zip(parts, map(int, row))) for row in zip(*parts.values())]
+                result['components'] = components[0] if single else components
+            # --quantiles: pXX bounds from the spread of the forest's trees
+            bounds = {k: artifacts.to_counts(v) for k, v in preds.items() if k not in parts and k != 'cnt'}
+            if bounds:
+                intervals = [dict(zip(bounds, map(int, row))) for row in zip(*bounds.values())]
+                result['intervals'] = intervals[0] if single else intervals
+        else:
+            counts = artifacts.to_counts(preds).tolist()
+            result = {'prediction': counts[0]} if single else {'predictions': counts}
+        return '200 OK', 'application/json', json.dumps(result).encode()
+
+def load_serving(models_dir, data_path, quantiles=None):
+    model, _, plan, lag_index = artifacts.load_artifacts(models_dir, data_path)
+    res = {'model': model, 'plan': plan, 'lag_index': lag_index}
+    if quantiles:
+        # intervals walk every tree at once; None for models that are not forests
+        res['forest'] = explain.as_flat(model)
+        if res['forest'] is None:
+            print(f"{type(model).__name__} has no trees to take quantiles over; serving point predictions")
+    return res
+
+def predict_total(res, samples):
+    # cnt for any model; segment models' outputs are summed
+    return utils.predict_batch(res['model'], samples, plan=res['plan'], lag_index=res['lag_index'])
+
+async def serve(host, port, models_dir, data_path, max_batch, max_wait_ms, profile_every=None,
+                profiler='cprofile', registry_dir=None, shadow_log=None, poll_s=2.0, quantiles=None):
+    if profile_every is not None:
+        instrument.registry.enable(profile_every, profiler)
+
+    def make_loader(directory):
+        return warmup.BackgroundLoader(
+            lambda: load_serving(directory, data_path, quantiles),
+            lambda res: warmup.warm_model(res.get('forest') or res['model'], res['plan'], res['lag_index'])).start()
+
+    shadow = None
+    if registry_dir:
+        # LIVE is hot-swapped once a newly promoted version is loaded and warm; CANDIDATE is shadow-scored
+        reg = registry.ModelRegistry(registry_dir)
+        live = registry.HotSwap(reg.live_dir, make_loader, poll_s)
+        shadow = registry.ShadowScorer(registry.HotSwap(reg.candidate_dir, make_loader, poll_s),
+                                       predict_total, log_path=shadow_log)
+    else:
+        live = registry.HotSwap(lambda: models_dir, make_loader)
+    if live.loader is None:
+        raise ValueError(f"No LIVE version in {registry_dir}")
+    live.loader.wait()
+
+    def predict(samples):
+        res = live.check().resources
+        t0 = time.perf_counter()
+        # runs in the executor thread, so a sampled cProfile covers encoding and traversal
+        with instrument.request('batch'):
+            if res.get('forest') is not None:
+                preds = utils.predict_intervals(res['forest'], samples, quantiles, plan=res['plan'],
+                                                lag_index=res['lag_index'])
+            elif getattr(res['model'], 'n_outputs_', 1) == 2:
+                preds = utils.predict_components(res['model'], samples, plan=res['plan'], lag_index=res['lag_index'])
+            else:
+                preds = predict_total(res, samples)
+        if shadow is not None:
+            shadow.submit(samples, preds['cnt'] if isinstance(preds, dict) else preds, time.perf_counter() - t0)
+        return preds
+
+    batcher = MicroBatcher(predict, max_batch=max_batch, max_wait=max_wait_ms / 1000)
+    server = PredictionServer(batcher, live, shadow)
+    batch_task = asyncio.create_task(batcher.run())
+    tcp = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving predictions on http://{host}:{port} (max_batch={max_batch}, max_wait={max_wait_ms}ms)")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        batch_task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--models_dir", default="../models", help="Directory with the trained artifacts")
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Used to build the lag index if not exported")
+    parser.add_argument("--max_batch", type=int, default=64, help="Max rows scored per model.predict call")
+    parser.add_argument("--max_wait_ms", type=float, default=5.0, help="Max time a request waits for its batch to fill")
+    parser.add_argument("--profile_every", type=int, default=None,
+                        help="Record per-stage timings on /metrics and profile one batch in N (0: timings only)")
+    parser.add_argument("--profiler", choices=["cprofile", "tracemalloc"], default="cprofile",
+                        help="What a sampled batch is profiled with")
+    parser.add_argument("--registry_dir", default=None,
+                        help="Serve the registry's LIVE version (hot-swapped on promotion) instead of --models_dir")
+    parser.add_argument("--shadow_log", default=None,
+                        help="Append per-request divergence of the CANDIDATE version here as JSON lines")
+    parser.add_argument("--poll_s", type=float, default=2.0, help="How often the registry pointers are re-read")
+    parser.add_argument("--quantiles", default=None,
+                        help="Comma separated quantiles of the per-tree predictions returned as 'intervals', e.g. 0.1,0.9")
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.models_dir, args.data_path, args.max_batch, args.max_wait_ms,
+                      args.profile_every, args.profiler, args.registry_dir, args.shadow_log, args.poll_s,
+                      [float(q) for q in args.quantiles.split(",")] if args.quantiles else None))
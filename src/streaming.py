@@ -0,0 +1,78 @@
+# src/streaming.py
+# Chunked ingestion: CSV -> encoded float32 matrix on disk, never holding the dataset in memory.
+import os
+import numpy as np
+import pandas as pd
+import utils
+
+HOUR_DTYPES = utils.HOUR_DTYPES
+RAW_COLS = ['dteday', 'season', 'yr', 'mnth', 'hr', 'holiday', 'weekday', 'workingday',
+            'weathersit', 'temp', 'atemp', 'hum', 'windspeed']
+
+def count_rows(path, block_size=1 << 20):
+    """Number of data rows in a CSV, counted in binary blocks without parsing."""
+    n, last = 0, b'\n'
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            n += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        n += 1  # no trailing newline on the last row
+    return n - 1  # header
+
+def iter_chunks(path, chunksize, target_col='cnt'):
+    """Yield CSV chunks in compact dtypes with prev_day_same_hour filled in.
+
+    Rows must be in chronological (dteday, hr) order, as the dataset exports are.
+    The last two days seen are carried into the next chunk so the lag lookup
+    works across chunk boundaries. Hours with no history are left NaN.
+    """
+    usecols = RAW_COLS + [target_col]
+    dtypes = {c: t for c, t in HOUR_DTYPES.items() if c in usecols}
+    carry = None
+    for chunk in pd.read_csv(path, usecols=usecols, dtype=dtypes, chunksize=chunksize):
+        chunk['dteday'] = utils._as_days(chunk['dteday'].to_numpy())
+        history = chunk if carry is None else pd.concat([carry, chunk], ignore_index=True)
+        lag_index = utils.LagIndex.from_frame(history, target_col)
+        chunk['prev_day_same_hour'] = lag_index.prev_day_same_hour(chunk['dteday'], chunk['hr'])
+        carry = history[history['dteday'] >= history['dteday'].iloc[-1] - np.timedelta64(1, 'D')]
+        yield chunk
+
+def build_memmap_matrix(path, out_dir, chunksize=100_000, target_col='cnt', plan=None):
+    """Encode a CSV chunk by chunk into out_dir/X.npy and out_dir/y.npy.
+
+    Returns read-only memory-mapped X and y plus the feature columns. Peak
+    memory is one chunk plus the lag carry, independent of the file size.
+    """
+    if plan is None:
+        plan = utils.compile_encoding_plan(utils.encoded_column_names())
+    n_rows = count_rows(path)
+    os.makedirs(out_dir, exist_ok=True)
+    X_path, y_path = os.path.join(out_dir, 'X.npy'), os.path.join(out_dir, 'y.npy')
+    X = np.lib.format.open_memmap(X_path, mode='w+', dtype=np.float32,
+                                  shape=(n_rows, len(plan['columns'])))
+    y = np.lib.format.open_memmap(y_path, mode='w+', dtype=np.float32, shape=(n_rows,))
+
+    start, no_history = 0, []
+    for chunk in iter_chunks(path, chunksize, target_col):
+        stop = start + len(chunk)
+        no_history.append(start + np.flatnonzero(chunk['prev_day_same_hour'].isna().to_numpy()))
+        utils.encode_batch(chunk, plan=plan, out=X[start:stop])
+        y[start:stop] = chunk[target_col].to_numpy()
+        start = stop
+
+    # same fallback as add_lag_features and serving, now that the whole target is known: the hour's median
+    index = {spec['name']: spec['index'] for spec in plan['columns']}
+    missing = np.concatenate(no_history)
+    hrs = X[:, index['hr']].astype(np.int64)
+    hour_medians = np.array([np.median(y[hrs == h]) if (hrs == h).any() else np.nan for h in range(24)])
+    X[missing, index['prev_day_same_hour']] = hour_medians[hrs[missing]]
+    X.flush()
+    y.flush()
+    del X, y
+
+    feature_columns = pd.Index([spec['name'] for spec in plan['columns']])
+    return np.load(X_path, mmap_mode='r'), np.load(y_path, mmap_mode='r'), feature_columns
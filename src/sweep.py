@@ -0,0 +1,124 @@
+# src/sweep.py
+# Scenario sweeps: predictions over the Cartesian product of input ranges, built and scored chunk by chunk.
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import utils
+import artifacts
+import validation
+
+# value of every raw input field that is neither swept nor fixed by the caller
+DEFAULT_INPUT = {'season': 1, 'yr': 0, 'mnth': 1, 'holiday': 0, 'weekday': 0, 'workingday': 0,
+                 'weathersit': 1, 'temp': 0.5, 'atemp': 0.5, 'hum': 0.5, 'windspeed': 0.2, 'hr': 12}
+# a field that follows another one when only the other is swept
+TIED = {'atemp': 'temp'}
+
+def grid_axes(spec):
+    """{'field': {'start', 'stop', 'num'}} or explicit value lists -> {'field': 1-d float array}."""
+    axes = {}
+    for field, values in spec.items():
+        if isinstance(values, dict):
+            values = np.linspace(values['start'], values['stop'], int(values['num']))
+        axes[field] = np.asarray(values, dtype=np.float64)
+    return axes
+
+def resolve_fixed(axes, fixed=None):
+    """Values for every non-swept field: the caller's, else DEFAULT_INPUT; None marks a tied field."""
+    given = fixed or {}
+    out = {k: v for k, v in dict(DEFAULT_INPUT, **given).items() if k not in axes}
+    for field, leader in TIED.items():
+        if leader in axes and field not in axes and field not in given:
+            out[field] = None
+    return out
+
+def grid_chunk(axes, fixed, start, stop):
+    """Columns for the flat grid points [start, stop), in C order over the axes."""
+    names = list(axes)
+    idx = np.unravel_index(np.arange(start, stop), tuple(len(axes[n]) for n in names))
+    cols = {n: axes[n][i] for n, i in zip(names, idx)}
+    for field, value in fixed.items():
+        if value is None:
+            cols[field] = cols[TIED[field]]
+        else:
+            cols[field] = np.full(stop - start, value, dtype=np.float64)
+    return cols
+
+def _score(loaded, axes, fixed, start, stop):
+    cols = grid_chunk(axes, fixed, start, stop)
+    preds = utils.predict_batch(loaded['model'], cols, plan=loaded['plan'], lag_index=loaded['lag_index'])
+    return preds.astype(np.float32)
+
+def _score_range(args):
+    axes, fixed, start, stop = args
+    return start, _score(artifacts.worker, axes, fixed, start, stop)
+
+def sweep(axes, fixed=None, loaded=None, models_dir=None, data_path=None, chunksize=65_536,
+          n_jobs=-1, out_path=None):
+    """Predict every point of the Cartesian product of axes; returns an array shaped like the axes.
+
+    Points are generated per chunk from their flat index, so memory is one
+    encoded chunk per worker plus the float32 result (a memmap at out_path for
+    grids too big to hold). With models_dir and more than one core the chunks
+    are scored in a process pool sharing the memory-mapped model; otherwise in
+    this process with `loaded` = dict(model=..., plan=..., lag_index=...).
+    """
+    axes = {k: np.asarray(v, dtype=np.float64) for k, v in axes.items()}
+    fixed = resolve_fixed(axes, fixed)
+    shape = tuple(len(v) for v in axes.values())
+    n = int(np.prod(shape))
+    if out_path:
+        out = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=(n,))
+    else:
+        out = np.empty(n, dtype=np.float32)
+    ranges = [(start, min(start + chunksize, n)) for start in range(0, n, chunksize)]
+    workers = validation.total_cores(n_jobs) if models_dir else 1
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        if loaded is None:
+            model, _, plan, lag_index = artifacts.load_artifacts(models_dir, data_path)
+            loaded = dict(model=model, plan=plan, lag_index=lag_index)
+        for start, stop in ranges:
+            out[start:stop] = _score(loaded, axes, fixed, start, stop)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=artifacts.init_worker,
+                                 initargs=(models_dir, data_path)) as pool:
+            # at most two chunks per worker in flight keeps memory bounded on huge grids
+            tasks, in_flight = iter(ranges), deque()
+            for start, stop in tasks:
+                in_flight.append(pool.submit(_score_range, (axes, fixed, start, stop)))
+                if len(in_flight) >= 2 * workers:
+                    start_done, preds = in_flight.popleft().result()
+                    out[start_done:start_done + len(preds)] = preds
+            while in_flight:
+                start_done, preds = in_flight.popleft().result()
+                out[start_done:start_done + len(preds)] = preds
+    elapsed = time.perf_counter() - t0
+    if out_path:
+        out.flush()
+    print(f"Swept {n:,} points over {list(axes)} in {len(ranges)} chunks with {workers} workers "
+          f"in {elapsed:.2f}s ({n / elapsed:,.0f} points/s)")
+    return out.reshape(shape)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--axes", required=True,
+                        help='JSON {"field": [values] or {"start": a, "stop": b, "num": n}}, e.g. '
+                             '\'{"temp": {"start": 0, "stop": 1, "num": 50}, "hr": [0, 1, 2]}\'')
+    parser.add_argument("--fixed", default="{}", help="JSON values for fields that are not swept")
+    parser.add_argument("--models_dir", default="../models", help="Directory with the trained artifacts")
+    parser.add_argument("--data_path", default="../data/hour.csv", help="Used to build the lag index if not exported")
+    parser.add_argument("--chunksize", type=int, default=65_536, help="Grid points encoded and scored per task")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Worker processes (-1: all cores)")
+    parser.add_argument("--out_path", default="../models/sweep.npy", help="Where to write the result grid (.npy)")
+    args = parser.parse_args()
+    axes = grid_axes(json.loads(args.axes))
+    os.makedirs(os.path.dirname(os.path.abspath(args.out_path)), exist_ok=True)
+    grid = sweep(axes, json.loads(args.fixed), models_dir=args.models_dir, data_path=args.data_path,
+                 chunksize=args.chunksize, n_jobs=args.n_jobs, out_path=args.out_path)
+    print(f"Saved {grid.shape} grid to {args.out_path}: min {grid.min():.0f}, "
+          f"mean {grid.mean():.1f}, max {grid.max():.0f}")
@@ -1,63 +1,425 @@
 # src/train_model.py
 import argparse
+import io
+import json
+import os
+import shutil
+import time
 import joblib
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split, RandomizedSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
 import utils
+import streaming
+import cache
+import validation
+import forest_export
+import engines
+import registry
+
+def load_training_matrix(data_path, chunksize=None, memmap_dir=None, cache_dir=None, plan=None, compact=False):
+    """Return X_encoded, y, feature_columns and the lag index for a dataset.
+
+    With a chunksize the CSV is streamed into memory-mapped arrays under
+    memmap_dir instead of being loaded and copied as DataFrames. With a
+    cache_dir the encoded arrays are reused across runs until the CSV or the
+    feature code changes. A plan fixes the encoding (e.g. an engine's native
+    categorical columns); without one the one-hot levels come from the data.
+    compact reads the CSV in int8/float32 and encodes it in place into one
+    preallocated float32 array (utils.build_feature_matrix_compact).
+    """
+    if cache_dir:
+        def build(entry_dir):
+            if chunksize:
+                feature_columns = streaming.build_memmap_matrix(data_path, entry_dir, chunksize, plan=plan)[2]
+                return feature_columns, utils.LagIndex.from_csv(data_path)
+            X_encoded, y, feature_columns, lag_index = load_training_matrix(data_path, plan=plan, compact=compact)
+            np.save(os.path.join(entry_dir, 'X.npy'), np.asarray(X_encoded, dtype=np.float32))
+            np.save(os.path.join(entry_dir, 'y.npy'), np.asarray(y, dtype=np.float32))
+            return feature_columns, lag_index
+        variant = json.dumps([spec['name'] for spec in plan['columns']]) if plan else ''
+        variant += ' compact' if compact else ''
+        return cache.load_or_build(data_path, cache_dir, build, variant)
+
+    if chunksize:
+        print(f"Streaming {data_path} in chunks of {chunksize} rows into {memmap_dir}")
+        X_encoded, y, feature_columns = streaming.build_memmap_matrix(data_path, memmap_dir, chunksize, plan=plan)
+        return X_encoded, y, feature_columns, utils.LagIndex.from_csv(data_path)
+
+    if compact:
+        header = pd.read_csv(data_path, nrows=0).columns
+        df = pd.read_csv(data_path, dtype={c: t for c, t in utils.HOUR_DTYPES.items() if c in header})
+        X_encoded, y, feature_columns = utils.build_feature_matrix_compact(df, plan=plan)
+        return X_encoded, y, feature_columns, utils.LagIndex.from_frame(df, target_col='cnt')
 
-def main(data_path, model_out, cols_out, random_state=42):
-    print("Loading data:", data_path)
     df = pd.read_csv(data_path)
     if 'dteday' in df.columns:
         df['dteday'] = pd.to_datetime(df['dteday'])
 
     # feature engineering
     df = utils.feature_engineer(df)
-    df = utils.add_lag_features(df, target_col='cnt')
+    lag_index = utils.LagIndex.from_frame(df, target_col='cnt')
+    df = utils.add_lag_features(df, target_col='cnt', lag_index=lag_index)
 
     # build X/y and encode
-    X_encoded, y, feature_columns = utils.build_feature_matrix(df)
-
-    # train/test split
-    X_train, X_test, y_train, y_test = train_test_split(X_encoded, y, test_size=0.2, random_state=random_state)
-
-    # hyperparameter distribution
-    param_dist = {
-        'n_estimators': [100, 200, 300],
-        'max_depth': [10, 20, None],
-        'min_samples_split': [2, 5, 10],
-        'min_samples_leaf': [1, 2, 4],
-        'max_features': ['sqrt', 'log2', 0.8],
-        'bootstrap': [True, False]
-    }
-
-    rf = RandomForestRegressor(random_state=random_state, n_jobs=-1)
-    rs = RandomizedSearchCV(rf, param_distributions=param_dist, n_iter=10, cv=3,
-                            scoring='r2', n_jobs=-1, random_state=random_state, verbose=2)
-    print("Starting RandomizedSearchCV...")
-    rs.fit(X_train, y_train)
+    X_encoded, y, feature_columns = utils.build_feature_matrix(df, plan=plan)
+    return X_encoded, y, feature_columns, lag_index
+
+def row_timestamps(data_path):
+    """dteday + hr of every row, in the (date, hour) order the feature matrix is built in."""
+    df = pd.read_csv(data_path, usecols=['dteday', 'hr'])
+    return np.sort((pd.to_datetime(df['dteday']) + pd.to_timedelta(df['hr'], unit='h')).to_numpy())
+
+def segment_targets(data_path, y):
+    """casual/registered for the rows of y (cnt), read from data_path, as an (n, 2) float32 array."""
+    segments = pd.read_csv(data_path, usecols=utils.SEGMENT_COLS)
+    if isinstance(y, pd.Series):
+        segments = segments.loc[y.index]
+    Y = segments[utils.SEGMENT_COLS].to_numpy(dtype=np.float32)
+    # every loading path keeps the CSV's row order; check rather than trust it
+    if not np.array_equal(Y.sum(axis=1), np.asarray(y, dtype=np.float32)):
+        raise ValueError(f"casual + registered does not match cnt row by row in {data_path}")
+    return Y
+
+def build_search(search, engine, feature_columns, search_cv, n_jobs=-1, random_state=42):
+    """Hyperparameter search over one registered engine, splitting the core budget between candidates and the estimator.
+
+    'random' samples 10 full-size candidates. 'halving' runs successive halving
+    with the engine's size parameter (trees or boosting iterations) as the
+    resource: 18 candidates start at a ninth of the maximum and only the best
+    third advance at each rung.
+
+    Returns the search and the thread cap to fit it under: None when the
+    engine takes its share of cores as n_jobs, else that share (see
+    validation.thread_limit).
+    """
+    spec = engines.ENGINES[engine]
+    param_dist = spec['param_dist']
+    if search == 'halving':
+        param_dist = {k: v for k, v in param_dist.items() if k != spec['resource']}
+        n_candidates, factor, max_resource = 18, 3, spec['max_resource']
+        search_jobs, model_jobs = validation.split_cores(n_jobs, n_candidates * 3)
+        est = spec['make'](random_state, model_jobs, feature_columns)
+        rs = HalvingRandomSearchCV(est, param_distributions=param_dist, n_candidates=n_candidates,
+                                   factor=factor, resource=spec['resource'],
+                                   min_resources=max_resource // factor ** 2, max_resources=max_resource,
+                                   cv=search_cv, scoring='r2', n_jobs=search_jobs,
+                                   random_state=random_state, verbose=1)
+        return rs, None if spec['n_jobs'] else model_jobs
+
+    # split the core budget between search candidates and trees instead of nesting n_jobs=-1
+    n_iter = 10
+    search_jobs, model_jobs = validation.split_cores(n_jobs, n_iter * 3)
+    est = spec['make'](random_state, model_jobs, feature_columns)
+    rs = RandomizedSearchCV(est, param_distributions=param_dist, n_iter=n_iter, cv=search_cv,
+                            scoring='r2', n_jobs=search_jobs, random_state=random_state, verbose=2)
+    return rs, None if spec['n_jobs'] else model_jobs
+
+def serving_report(model, X_test, y_test, repeats=50):
+    """Holdout R2/MAE plus what serving sees: single-row latency, batch throughput, artifact size.
+
+    Segment models are scored per segment and, like every other model, on cnt.
+    """
+    preds = model.predict(X_test)
+    segments = {}
+    if preds.ndim == 2:
+        y_test = np.asarray(y_test)
+        segments = {name: {'r2': r2_score(y_test[:, i], preds[:, i]),
+                           'mae': mean_absolute_error(y_test[:, i], preds[:, i])}
+                    for i, name in enumerate(utils.SEGMENT_COLS)}
+        y_test, preds = y_test.sum(axis=1), preds.sum(axis=1)
+    one = X_test[:1]
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        model.predict(one)
+        times.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    model.predict(X_test)
+    batch_s = time.perf_counter() - t0
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    return {'segments': segments, 'r2': r2_score(y_test, preds), 'mse': mean_squared_error(y_test, preds),
+            'mae': mean_absolute_error(y_test, preds),
+            'predict_ms': float(np.median(times)) * 1000,
+            'batch_rows_per_s': len(X_test) / batch_s,
+            'artifact_mb': buf.getbuffer().nbytes / 1e6}
+
+def print_engine_report(results):
+    print(f"{'engine':<8}{'fit s':>10}{'predict ms':>12}{'rows/s':>12}{'size MB':>10}{'R2':>8}{'MAE':>8}")
+    for name, r in results.items():
+        m = r['metrics']
+        print(f"{name:<8}{r['fit_seconds']:>10.1f}{m['predict_ms']:>12.2f}{m['batch_rows_per_s']:>12,.0f}"
+              f"{m['artifact_mb']:>10.1f}{m['r2']:>8.4f}{m['mae']:>8.2f}")
+
+def train_engine(engine, data_path, chunksize=None, memmap_dir=None, cache_dir=None, cv='random',
+                 n_jobs=-1, search='random', random_state=42, compact=False, targets='cnt'):
+    """Encode the data for one engine, search its space and evaluate the best model on the holdout.
+
+    targets='segments' fits casual and registered jointly (one multi-output model).
+    """
+    print(f"[{engine}] Loading data:", data_path)
+    t0 = time.perf_counter()
+    X_encoded, y, feature_columns, lag_index = load_training_matrix(
+        data_path, chunksize, memmap_dir, cache_dir, plan=engines.engine_plan(engine), compact=compact)
+    if targets == 'segments':
+        y = segment_targets(data_path, y)
+    print(f"Feature matrix {X_encoded.shape} ready in {time.perf_counter() - t0:.3f}s")
+
+    # train/test split; time mode keeps the last 20% of hours as the holdout
+    if cv == 'time':
+        X_train, X_test, y_train, y_test = validation.chronological_split(X_encoded, y, test_size=0.2)
+        search_cv = validation.time_series_cv(n_splits=3)
+    else:
+        X_train, X_test, y_train, y_test = train_test_split(X_encoded, y, test_size=0.2, random_state=random_state)
+        search_cv = 3
+    # the saved model is refit on the training rows only; in time mode they end where the holdout starts
+    watermark = (pd.Timestamp(row_timestamps(data_path)[len(y_train) - 1]) if cv == 'time'
+                 else lag_index.last_timestamp())
+
+    rs, threads = build_search(search, engine, feature_columns, search_cv, n_jobs, random_state)
+    model_jobs = threads or getattr(rs.estimator, 'n_jobs', None) or 'all'
+    print(f"Starting {type(rs).__name__} for {engine} ({rs.n_jobs} workers x {model_jobs} model jobs)...")
+    t0 = time.perf_counter()
+    with validation.thread_limit(threads):
+        rs.fit(X_train, y_train)
+    search_time = time.perf_counter() - t0
     best_model = rs.best_estimator_
     print("Best params:", rs.best_params_)
+    print(f"Search: {len(rs.cv_results_['params']) * rs.n_splits_} fits in {search_time:.1f}s, "
+          f"best CV R2 {rs.best_score_:.4f}")
+
+    metrics = serving_report(best_model, X_test, y_test)
+    print("R2:", metrics['r2'])
+    print("MSE:", metrics['mse'])
+    print("MAE:", metrics['mae'])
+    for name, m in metrics['segments'].items():
+        print(f"  {name}: R2 {m['r2']:.4f}, MAE {m['mae']:.2f}")
+    return {'model': best_model, 'best_params': rs.best_params_, 'feature_columns': feature_columns,
+            'lag_index': lag_index, 'X': X_encoded, 'y': y, 'fit_seconds': rs.refit_time_,
+            'watermark': watermark, 'train_rows': len(y_train),
+            'search_seconds': search_time, 'metrics': metrics}
 
-    # evaluation
-    preds = best_model.predict(X_test)
-    print("R2:", r2_score(y_test, preds))
-    print("MSE:", mean_squared_error(y_test, preds))
-    print("MAE:", mean_absolute_error(y_test, preds))
+def main(data_path, model_out, cols_out, plan_out=None, lag_out=None,
+         chunksize=None, memmap_dir=None, cache_dir=None, cv='random', n_folds=5,
+         n_jobs=-1, search='random', flat_out=None, meta_out=None, random_state=42, engine='rf',
+         compact=False, targets='cnt'):
+    t_start = time.perf_counter()
+    names = list(engines.ENGINES) if engine == 'all' else [engine]
+    if targets == 'segments':
+        single = [name for name in names if not engines.ENGINES[name]['multi_output']]
+        if single and engine != 'all':
+            raise ValueError(f"--targets segments needs a multi-output engine, not {engine}")
+        names = [name for name in names if name not in single]
+    results = {}
+    for name in names:
+        results[name] = train_engine(name, data_path, chunksize, memmap_dir, cache_dir, cv,
+                                     n_jobs, search, random_state, compact, targets)
+    print_engine_report(results)
+    engine = max(results, key=lambda name: results[name]['metrics']['r2'])
+    best = results[engine]
+    best_model, feature_columns, lag_index = best['model'], best['feature_columns'], best['lag_index']
+    if len(results) > 1:
+        print(f"Keeping {engine} (best holdout R2)")
+
+    if cv == 'time':
+        print(f"Rolling-origin evaluation over {n_folds} expanding-window folds...")
+        folds = validation.evaluate_folds(best_model, best['X'], best['y'],
+                                          validation.time_series_cv(n_splits=n_folds), n_jobs=n_jobs)
+        validation.print_fold_report(folds)
 
     # save model and feature columns
     joblib.dump(best_model, model_out)
     joblib.dump(feature_columns, cols_out)
     print("Saved model to", model_out)
     print("Saved feature columns to", cols_out)
+    if plan_out:
+        utils.save_encoding_plan(utils.compile_encoding_plan(feature_columns), plan_out)
+        print("Saved encoding plan to", plan_out)
+    if lag_out:
+        lag_index.save(lag_out)
+        print("Saved lag index to", lag_out)
+    if flat_out:
+        if isinstance(best_model, RandomForestRegressor):
+            forest_export.export_forest(best_model, flat_out)
+            print("Saved flat forest to", flat_out)
+        elif os.path.isdir(flat_out):
+            # serving prefers the flat export, so a stale forest would shadow the new model
+            shutil.rmtree(flat_out)
+            print("Removed stale flat forest", flat_out)
+    if meta_out:
+        save_train_meta(meta_out, {
+            'engine': engine,
+            'targets': utils.SEGMENT_COLS if targets == 'segments' else ['cnt'],
+            'best_params': best['best_params'],
+            'watermark': best['watermark'].isoformat(),
+            'train_rows': int(best['train_rows']),
+            'n_estimators': len(getattr(best_model, 'estimators_', [])) or best_model.n_iter_,
+            'train_seconds': time.perf_counter() - t_start,
+            'metrics': best['metrics'],
+            'engines': {name: {'fit_seconds': r['fit_seconds'], 'metrics': r['metrics']}
+                        for name, r in results.items()},
+        })
+        print("Saved training metadata to", meta_out)
+
+def publish_version(registry_dir, data_path, model_out, cols_out, plan_out=None, lag_out=None,
+                    flat_out=None, meta_out=None, promote='live'):
+    """Copy the artifacts just written into a new registry version, optionally making it LIVE or CANDIDATE."""
+    reg = registry.ModelRegistry(registry_dir)
+    files = {'bike_model.pkl': model_out, 'feature_columns.pkl': cols_out, 'encoding_plan.json': plan_out,
+             'lag_index.npz': lag_out, 'bike_model_flat': flat_out, 'train_meta.json': meta_out}
+    version = reg.publish(files, registry.training_metadata(meta_out, data_path, plan_out),
+                          promote=None if promote == 'none' else promote)
+    print(f"Published {version} to {registry_dir}" + ('' if promote == 'none' else f" as {promote.upper()}"))
+    return version
+
+def save_train_meta(path, meta):
+    with open(path, 'w') as f:
+        json.dump(meta, f, indent=1, default=str)
+
+def load_train_meta(path):
+    with open(path) as f:
+        return json.load(f)
+
+def as_trained(model, X):
+    """X in the representation model was fitted on: a DataFrame if it recorded feature names.
+
+    The compact, chunked and cached training paths fit on float32 arrays;
+    fitting more trees on a DataFrame would warn and change feature_names_in_.
+    """
+    return X if hasattr(model, 'feature_names_in_') else X.to_numpy(np.float32)
+
+def incremental_update(data_path, model_out, cols_out, meta_path, strategy='warm_start',
+                       extra_trees=20, window_days=365, max_trees=500, lag_out=None, flat_out=None,
+                       n_jobs=-1):
+    """Update the saved model with rows newer than its training watermark.
+
+    warm_start grows the existing forest by extra_trees trees fitted on the
+    last window_days of data (which hold the new rows), dropping the oldest
+    trees beyond max_trees. window refits a forest with the saved best params
+    on that same window. Either way the hyperparameter search is skipped.
+    """
+    t0 = time.perf_counter()
+    meta = load_train_meta(meta_path)
+    watermark = pd.Timestamp(meta['watermark'])
+    model = joblib.load(model_out)
+    if not isinstance(model, RandomForestRegressor):
+        raise ValueError(f"Incremental updates need a RandomForest model, got {type(model).__name__}")
+    feature_columns = joblib.load(cols_out)
+    plan = utils.compile_encoding_plan(feature_columns)
+
+    df = pd.read_csv(data_path)
+    df['dteday'] = pd.to_datetime(df['dteday'])
+    lag_index = utils.LagIndex.from_frame(df, target_col='cnt')
+    df = utils.add_lag_features(df, target_col='cnt', lag_index=lag_index)
+    stamp = df['dteday'] + pd.to_timedelta(df['hr'], unit='h')
+    new = (stamp > watermark).to_numpy()
+    if not new.any():
+        print(f"No rows newer than the watermark {watermark}; nothing to do.")
+        return model
+
+    # segment models keep fitting casual/registered jointly
+    segments = model.n_outputs_ == 2
+    X_new, y_new, _ = utils.build_feature_matrix(df[new], plan=plan)
+    X_new = as_trained(model, X_new)
+    if segments:
+        y_new = df[new][utils.SEGMENT_COLS]
+    preds = model.predict(X_new)
+    total, pred_total = (y_new.sum(axis=1), preds.sum(axis=1)) if segments else (y_new, preds)
+    print(f"{new.sum()} new rows after {watermark}; current model on them: "
+          f"R2 {r2_score(total, pred_total):.4f}, MAE {mean_absolute_error(total, pred_total):.2f}")
+
+    # trees fitted on the new rows alone would only know a few days of the year
+    recent = (stamp > stamp.max() - pd.Timedelta(days=window_days)).to_numpy()
+    X_win, y_win, _ = utils.build_feature_matrix(df[recent], plan=plan)
+    X_win = as_trained(model, X_win)
+    if segments:
+        y_win = df[recent][utils.SEGMENT_COLS]
+    if strategy == 'warm_start':
+        n_trees = len(model.estimators_) + extra_trees
+        model.set_params(warm_start=True, n_estimators=n_trees, n_jobs=validation.total_cores(n_jobs))
+        model.fit(X_win, y_win)
+        if len(model.estimators_) > max_trees:
+            model.estimators_ = model.estimators_[-max_trees:]
+            model.set_params(n_estimators=max_trees)
+        model.set_params(warm_start=False)
+        print(f"Warm-started {extra_trees} trees on the last {window_days} days ({recent.sum()} rows, "
+              f"{len(model.estimators_)} trees total)")
+        train_rows = meta['train_rows'] + int((new & recent).sum())
+    else:
+        model = RandomForestRegressor(random_state=42, n_jobs=validation.total_cores(n_jobs),
+                                      **meta['best_params'])
+        model.fit(X_win, y_win)
+        print(f"Refit on the last {window_days} days ({recent.sum()} rows) with the saved best params")
+        train_rows = int(recent.sum())
+
+    elapsed = time.perf_counter() - t0
+    joblib.dump(model, model_out)
+    print("Saved model to", model_out)
+    if lag_out:
+        lag_index.save(lag_out)
+        print("Saved lag index to", lag_out)
+    if flat_out:
+        forest_export.export_forest(model, flat_out)
+        print("Saved flat forest to", flat_out)
+    meta.update(watermark=lag_index.last_timestamp().isoformat(),
+                train_rows=train_rows,
+                n_estimators=len(model.estimators_),
+                last_incremental_seconds=elapsed)
+    save_train_meta(meta_path, meta)
+    print(f"New watermark {meta['watermark']}; incremental update took {elapsed:.1f}s vs "
+          f"{meta['train_seconds']:.1f}s for the last full retrain ({meta['train_seconds'] - elapsed:.1f}s saved)")
+    return model
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--data_path", default="../data/hour.csv", help="Path to CSV dataset")
     parser.add_argument("--model_out", default="../models/bike_model.pkl", help="Path to save trained model")
     parser.add_argument("--cols_out", default="../models/feature_columns.pkl", help="Path to save feature columns")
+    parser.add_argument("--plan_out", default="../models/encoding_plan.json", help="Path to save the encoding plan")
+    parser.add_argument("--lag_out", default="../models/lag_index.npz", help="Path to save the prev_day_same_hour lookup index")
+    parser.add_argument("--chunksize", type=int, default=None, help="Stream the CSV in chunks of this many rows")
+    parser.add_argument("--memmap_dir", default="../models/memmap", help="Where --chunksize writes the encoded X.npy/y.npy")
+    parser.add_argument("--cache_dir", default=None, help="Reuse the encoded dataset from this binary cache directory")
+    parser.add_argument("--cv", choices=["random", "time"], default="random",
+                        help="random: shuffled split/3-fold CV; time: chronological holdout and expanding-window CV")
+    parser.add_argument("--n_folds", type=int, default=5, help="Folds for the --cv time rolling-origin report")
+    parser.add_argument("--n_jobs", type=int, default=-1, help="Total cores shared by the search and the forest (-1: all)")
+    parser.add_argument("--search", choices=["random", "halving"], default="random",
+                        help="random: RandomizedSearchCV; halving: successive halving over n_estimators")
+    parser.add_argument("--flat_out", default="../models/bike_model_flat",
+                        help="Directory for the flattened, memory-mappable forest used for serving")
+    parser.add_argument("--meta_out", default="../models/train_meta.json",
+                        help="Path for training metadata (best params, watermark, metrics)")
+    parser.add_argument("--incremental", choices=["warm_start", "window"], default=None,
+                        help="Update the saved model with rows past its watermark instead of retraining")
+    parser.add_argument("--extra_trees", type=int, default=20, help="Trees added per --incremental warm_start run")
+    parser.add_argument("--max_trees", type=int, default=500, help="Forest size cap for --incremental warm_start")
+    parser.add_argument("--window_days", type=int, default=365,
+                        help="Days of recent data the --incremental trees are fitted on")
+    parser.add_argument("--engine", choices=list(engines.ENGINES) + ["all"], default="rf",
+                        help="Estimator to train; 'all' trains each, reports them side by side and keeps the best")
+    parser.add_argument("--compact", action="store_true",
+                        help="Read int8/float32 columns and encode in place into one float32 array (lower peak memory)")
+    parser.add_argument("--targets", choices=["cnt", "segments"], default="cnt",
+                        help="cnt: total demand; segments: one multi-output model for casual and registered")
+    parser.add_argument("--registry_dir", default=None,
+                        help="Also publish the artifacts as a new version of this model registry")
+    parser.add_argument("--promote", choices=["live", "candidate", "none"], default="live",
+                        help="Pointer the published version gets: served, shadow-scored, or neither")
     args = parser.parse_args()
-    main(args.data_path, args.model_out, args.cols_out)
+    if args.incremental:
+        incremental_update(args.data_path, args.model_out, args.cols_out, args.meta_out, args.incremental,
+                           args.extra_trees, args.window_days, args.max_trees, args.lag_out, args.flat_out,
+                           args.n_jobs)
+    else:
+        main(args.data_path, args.model_out, args.cols_out, args.plan_out, args.lag_out,
+             args.chunksize, args.memmap_dir, args.cache_dir, args.cv, args.n_folds, args.n_jobs,
+             args.search, args.flat_out, args.meta_out, engine=args.engine, compact=args.compact, targets=args.targets)
+    if args.registry_dir:
+        publish_version(args.registry_dir, args.data_path, args.model_out, args.cols_out, args.plan_out,
+                        args.lag_out, args.flat_out, args.meta_out, args.promote)
@@ -1,6 +1,45 @@
 # src/utils.py
+import json
+import warnings
 import pandas as pd
 import numpy as np
+import instrument
+
+# raw + engineered fields fed to the model, in training order
+FEATURE_COLS = ['season', 'yr', 'mnth', 'holiday', 'weekday', 'workingday', 'weathersit',
+                'temp', 'atemp', 'hum', 'windspeed', 'hr',
+                'hr_sin', 'hr_cos', 'temp_feels_like', 'weather_comfort',
+                'is_rush_hour', 'is_weekend', 'prev_day_same_hour']
+ONE_HOT_COLS = ['season', 'weathersit']
+# every level the dataset documents, for when they can't be discovered from one frame
+CATEGORY_LEVELS = {'season': [1, 2, 3, 4], 'weathersit': [1, 2, 3, 4]}
+# demand segments of cnt, predicted jointly by segment (multi-output) models
+SEGMENT_COLS = ['casual', 'registered']
+DEFAULT_PREV_DAY_SAME_HOUR = 200
+ENCODING_PLAN_VERSION = 1
+# compact dtypes for the hour.csv schema (read_csv defaults to int64/float64)
+HOUR_DTYPES = {
+    'season': np.int8, 'yr': np.int8, 'mnth': np.int8, 'hr': np.int8,
+    'holiday': np.int8, 'weekday': np.int8, 'workingday': np.int8, 'weathersit': np.int8,
+    'temp': np.float32, 'atemp': np.float32, 'hum': np.float32, 'windspeed': np.float32,
+    'casual': np.int16, 'registered': np.int16, 'cnt': np.int16,
+}
+# sin/cos of 2*pi*hr/24 for hr = 0..23, gathered instead of evaluating trig per row
+HR_SIN = np.sin(2 * np.pi * np.arange(24) / 24)
+HR_COS = np.cos(2 * np.pi * np.arange(24) / 24)
+
+# how each non one-hot model column is derived from the raw input fields
+# (mirrors feature_engineer; one-hot columns are added per level at compile time)
+COLUMN_SPECS = {
+    'hr_sin': {'transform': 'cyclic_sin', 'source': 'hr', 'period': 24},
+    'hr_cos': {'transform': 'cyclic_cos', 'source': 'hr', 'period': 24},
+    'temp_feels_like': {'transform': 'mean', 'source': ['temp', 'atemp']},
+    'weather_comfort': {'transform': 'product', 'source': ['atemp', 'hum'], 'complement': ['hum']},
+    'is_rush_hour': {'transform': 'in_ranges', 'source': 'hr', 'ranges': [[7, 9], [17, 19]]},
+    'is_weekend': {'transform': 'in_set', 'source': 'weekday', 'values': [0, 6]},
+    'prev_day_same_hour': {'transform': 'passthrough', 'source': 'prev_day_same_hour',
+                           'default': DEFAULT_PREV_DAY_SAME_HOUR},
+}
 
 def feature_engineer(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -18,43 +57,349 @@ def feature_engineer(df: pd.DataFrame) -> pd.DataFrame:
     df['is_weekend'] = df['weekday'].isin([0, 6]).astype(int)
     return df
 
-def add_lag_features(df: pd.DataFrame, target_col='cnt') -> pd.DataFrame:
+def calendar_fields(dates, holidays=()):
+    """Dataset calendar columns (season, yr, mnth, weekday, holiday, workingday) for dates.
+
+    Seasons switch on the dataset's dates (Mar 21, Jun 21, Sep 23, Dec 21);
+    weekday counts from Sunday = 0; yr is 0 for 2011 and 1 from 2012 on, the
+    only values the model has seen.
+    """
+    days = _as_days(dates)
+    ts = pd.DatetimeIndex(days)
+    mmdd = ts.month * 100 + ts.day
+    season = np.select([mmdd < 321, mmdd < 621, mmdd < 923, mmdd < 1221], [1, 2, 3, 4], 1)
+    weekday = (ts.dayofweek.to_numpy() + 1) % 7
+    holiday = np.isin(days, _as_days(list(holidays)) if len(holidays) else days[:0])
+    return {
+        'season': season,
+        'yr': np.clip(ts.year.to_numpy() - 2011, 0, 1),
+        'mnth': ts.month.to_numpy(),
+        'weekday': weekday,
+        'holiday': holiday.astype(int),
+        'workingday': (~np.isin(weekday, [0, 6]) & ~holiday).astype(int),
+    }
+
+class LagIndex:
+    """Dense (date, hour) -> count lookup for the prev_day_same_hour feature.
+
+    Counts live in a float32 array of shape (n_days, 24) indexed by the day
+    offset from `start`, so a lookup is two integer ops and a gather. Missing
+    hours are NaN. `hour_medians` is the fallback when no date is known.
+    """
+
+    def __init__(self, start, counts):
+        self.start = np.datetime64(start, 'D')
+        self.counts = np.asarray(counts, dtype=np.float32)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN hours
+            self.hour_medians = np.nanmedian(self.counts, axis=0).astype(np.float32)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, target_col='cnt'):
+        days = _as_days(df['dteday'])
+        start = days.min()
+        offsets = (days - start).astype(np.int64)
+        counts = np.full((offsets.max() + 1, 24), np.nan, dtype=np.float32)
+        counts[offsets, df['hr'].to_numpy(dtype=np.int64)] = df[target_col].to_numpy()
+        return cls(start, counts)
+
+    @classmethod
+    def from_csv(cls, path, target_col='cnt'):
+        return cls.from_frame(pd.read_csv(path, usecols=['dteday', 'hr', target_col]), target_col)
+
+    def save(self, path):
+        np.savez(path, start=np.array(self.start), counts=self.counts)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f['start'], f['counts'])
+
+    def last_timestamp(self):
+        """Timestamp of the latest (day, hour) holding a count: the training watermark."""
+        day, hr = np.argwhere(~np.isnan(self.counts))[-1]
+        return pd.Timestamp(self.start + np.timedelta64(int(day), 'D')) + pd.Timedelta(hours=int(hr))
+
+    def lookup(self, dates, hrs):
+        """Counts at (date, hour) for arrays of dates and hours; NaN where unknown."""
+        offsets = (_as_days(dates) - self.start).astype(np.int64)
+        hrs = np.asarray(hrs, dtype=np.int64)
+        ok = (offsets >= 0) & (offsets < len(self.counts)) & (hrs >= 0) & (hrs < 24)
+        out = np.full(offsets.shape, np.nan, dtype=np.float32)
+        out[ok] = self.counts[offsets[ok], hrs[ok]]
+        return out
+
+    def prev_day_same_hour(self, dates, hrs):
+        """Count one day earlier at the same hour; the hour's median when dates is None."""
+        if dates is None:
+            return self.hour_medians[np.asarray(hrs, dtype=np.int64) % 24]
+        return self.lookup(_as_days(dates) - np.timedelta64(1, 'D'), hrs)
+
+def _as_days(dates):
+    dates = np.atleast_1d(np.asarray(dates))
+    try:
+        # fast path for datetime64 and ISO date strings
+        return dates.astype('datetime64[D]')
+    except (TypeError, ValueError):
+        return np.asarray(pd.to_datetime(dates), dtype='datetime64[D]')
+
+def add_lag_features(df: pd.DataFrame, target_col='cnt', lag_index=None) -> pd.DataFrame:
+    """Add prev_day_same_hour: the target one calendar day earlier at the same hour.
+
+    Uses `lag_index` when given, otherwise a LagIndex built from df itself.
+    """
     df = df.copy()
     # make sure sorted by date/hour
     if 'dteday' in df.columns:
         df = df.sort_values(['dteday', 'hr'])
+        if lag_index is None:
+            lag_index = LagIndex.from_frame(df, target_col)
+        lag = lag_index.prev_day_same_hour(df['dteday'], df['hr'])
+        # no previous day: that hour's median, the same fallback serving uses (_fill_prev_day_same_hour)
+        df['prev_day_same_hour'] = np.where(np.isnan(lag), lag_index.prev_day_same_hour(None, df['hr']), lag)
     else:
         df = df.sort_values(['hr'])
-    df['prev_day_same_hour'] = df.groupby('hr')[target_col].shift(24)
-    # fallback: median of target
-    df['prev_day_same_hour'] = df['prev_day_same_hour'].fillna(df[target_col].median() if target_col in df.columns else 200)
+        df['prev_day_same_hour'] = np.nan
+    # fallback without dates (or for an hour never seen): median of target
+    df['prev_day_same_hour'] = df['prev_day_same_hour'].fillna(df[target_col].median() if target_col in df.columns else DEFAULT_PREV_DAY_SAME_HOUR)
     return df
 
-def build_feature_matrix(df: pd.DataFrame):
-    """Return X_encoded, y, and the encoded dataframe columns (useful to persist)"""
-    df = df.copy()
-    X = df[['season', 'yr', 'mnth', 'holiday', 'weekday', 'workingday', 'weathersit',
-            'temp', 'atemp', 'hum', 'windspeed', 'hr',
-            'hr_sin', 'hr_cos', 'temp_feels_like', 'weather_comfort',
-            'is_rush_hour', 'is_weekend', 'prev_day_same_hour']]
+def build_feature_matrix(df: pd.DataFrame, plan=None):
+    """Return X_encoded, y, and the encoded dataframe columns (useful to persist)
+
+    Without a plan the one-hot levels are discovered from df (dropping the first,
+    like get_dummies(drop_first=True)); the matrix itself is always filled by
+    running the encoding plan, the same code serving uses.
+    """
+    if plan is None:
+        levels = {field: sorted(df[field].unique()) for field in ONE_HOT_COLS}
+        plan = compile_encoding_plan(encoded_column_names(levels))
+    names = [spec['name'] for spec in plan['columns']]
+    X_encoded = pd.DataFrame(encode_batch(df, plan=plan), columns=names, index=df.index)
     y = df['cnt'] if 'cnt' in df.columns else None
-    X_encoded = pd.get_dummies(X, columns=['season', 'weathersit'], drop_first=True)
     return X_encoded, y, X_encoded.columns
 
-def prepare_input_df(sample_input: dict, feature_columns):
+def downcast(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert df's hour.csv columns to HOUR_DTYPES in place (categoricals int8, weather float32)."""
+    for col, dtype in HOUR_DTYPES.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def build_feature_matrix_compact(df: pd.DataFrame, plan=None, target_col='cnt', lag_index=None, out=None):
+    """Low-memory feature_engineer + add_lag_features + build_feature_matrix.
+
+    df is downcast in place and never copied or sorted (rows must already be
+    in (dteday, hr) order, as the dataset exports are); every model column is
+    written straight into `out`, a preallocated float32 (n, n_columns) array
+    (allocated here if None). Returns X, y as float32 arrays and the columns.
+    """
+    downcast(df)
+    if plan is None:
+        plan = compile_encoding_plan(encoded_column_names())
+    if 'dteday' in df.columns:
+        df['dteday'] = _as_days(df['dteday'].to_numpy())
+    cols = _as_columns(df)
+    y = cols[target_col].astype(np.float32) if target_col in cols else None
+    if 'dteday' in cols:
+        if lag_index is None:
+            lag_index = LagIndex.from_frame(df, target_col)
+        lag = lag_index.prev_day_same_hour(cols['dteday'], cols['hr'])
+        missing = np.isnan(lag)
+        lag[missing] = lag_index.prev_day_same_hour(None, cols['hr'][missing])
+        cols['prev_day_same_hour'] = lag
+    X = encode_batch(cols, plan=plan, out=out)
+    return X, y, pd.Index([spec['name'] for spec in plan['columns']])
+
+def encoded_column_names(levels=None, one_hot=True):
+    """Model column names for the given one-hot levels (first level dropped).
+
+    With one_hot=False season/weathersit stay single category-code columns,
+    for estimators that split on categories natively.
+    """
+    if not one_hot:
+        return list(FEATURE_COLS)
+    levels = levels or CATEGORY_LEVELS
+    names = [c for c in FEATURE_COLS if c not in ONE_HOT_COLS]
+    for field in ONE_HOT_COLS:
+        names += [f'{field}_{level}' for level in levels[field][1:]]
+    return names
+
+def prepare_input_df(sample_input: dict, feature_columns, plan=None, lag_index=None):
     """Turn a dict (single sample) into model-ready DataFrame with same columns as training."""
-    input_df = pd.DataFrame([sample_input.copy()])
-    # apply feature engineering
-    input_df = feature_engineer(input_df)
-    # ensure prev_day_same_hour provided or fallback
-    if 'prev_day_same_hour' not in input_df.columns:
-        input_df['prev_day_same_hour'] = sample_input.get('prev_day_same_hour', 200)
-    # select same feature order as training
-    input_features = input_df[['season', 'yr', 'mnth', 'holiday', 'weekday', 'workingday', 'weathersit',
-                               'temp', 'atemp', 'hum', 'windspeed', 'hr',
-                               'hr_sin', 'hr_cos', 'temp_feels_like', 'weather_comfort',
-                               'is_rush_hour', 'is_weekend', 'prev_day_same_hour']]
-    input_encoded = pd.get_dummies(input_features, columns=['season', 'weathersit'], drop_first=True)
-    # reindex to training columns
-    input_encoded = input_encoded.reindex(columns=feature_columns, fill_value=0)
-    return input_encoded
+    if plan is None:
+        plan = compile_encoding_plan(feature_columns)
+    X = encode_batch([sample_input], plan=plan, lag_index=lag_index)
+    with instrument.stage('prepare_input_df.frame'):
+        return pd.DataFrame(X, columns=feature_columns)
+
+def compile_encoding_plan(feature_columns):
+    """Compile the persisted feature columns into an encoding plan.
+
+    The plan lists, for every output column, its index, source field(s) and
+    transform. It is plain JSON so it can be saved next to the model and run
+    identically by training and serving.
+    """
+    columns = []
+    for j, col in enumerate(feature_columns):
+        col = str(col)
+        field, _, level = col.rpartition('_')
+        if field in ONE_HOT_COLS:
+            spec = {'transform': 'one_hot', 'source': field, 'level': float(level)}
+        else:
+            spec = COLUMN_SPECS.get(col, {'transform': 'passthrough', 'source': col})
+        columns.append(dict(spec, name=col, index=j))
+    return {'version': ENCODING_PLAN_VERSION, 'columns': columns}
+
+def save_encoding_plan(plan, path):
+    with open(path, 'w') as f:
+        json.dump(plan, f, indent=1)
+
+def load_encoding_plan(path):
+    with open(path) as f:
+        plan = json.load(f)
+    if plan.get('version') != ENCODING_PLAN_VERSION:
+        raise ValueError(f"Unsupported encoding plan version {plan.get('version')!r} in {path}")
+    return plan
+
+def _as_columns(samples):
+    """Accept a list of dicts, a dict of arrays, a structured array or a DataFrame; return dict of 1-d arrays."""
+    if isinstance(samples, pd.DataFrame):
+        return {k: samples[k].to_numpy() for k in samples.columns}
+    if isinstance(samples, dict):
+        return {k: np.atleast_1d(np.asarray(v)) for k, v in samples.items()}
+    if isinstance(samples, np.ndarray) and samples.dtype.names:
+        return {k: samples[k] for k in samples.dtype.names}
+    samples = list(samples)
+    keys = set().union(*samples) if samples else set()
+    cols = {}
+    for k in keys:
+        values = [s.get(k, np.nan) for s in samples]
+        try:
+            cols[k] = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            cols[k] = np.array(values, dtype=object)  # e.g. dteday strings
+    return cols
+
+def _apply_column(spec, cols, n):
+    t, src = spec['transform'], spec['source']
+    if t == 'passthrough':
+        if src not in cols:
+            # only derived inputs (prev_day_same_hour) have a default; a missing raw field is an error
+            if 'default' not in spec:
+                raise KeyError(src)
+            return spec['default']
+        v = cols[src]
+        if 'default' in spec and v.dtype.kind == 'f':
+            v = np.where(np.isnan(v), spec['default'], v)
+        return v
+    if t == 'one_hot':
+        return cols[src] == spec['level']
+    if t in ('cyclic_sin', 'cyclic_cos') and spec['period'] == 24 and cols[src].dtype.kind in 'iu':
+        return (HR_SIN if t == 'cyclic_sin' else HR_COS)[cols[src] % 24]
+    if t == 'cyclic_sin':
+        return np.sin(2 * np.pi * cols[src].astype(np.float64) / spec['period'])
+    if t == 'cyclic_cos':
+        return np.cos(2 * np.pi * cols[src].astype(np.float64) / spec['period'])
+    if t == 'mean':
+        return sum(cols[c] for c in src) / len(src)
+    if t == 'product':
+        v = np.ones(n)
+        for c in src:
+            v = v * ((1 - cols[c]) if c in spec.get('complement', ()) else cols[c])
+        return v
+    if t == 'in_ranges':
+        v = cols[src]
+        return np.logical_or.reduce([(v >= lo) & (v <= hi) for lo, hi in spec['ranges']])
+    if t == 'in_set':
+        return np.isin(cols[src], spec['values'])
+    raise ValueError(f"Unknown transform {t!r} for column {spec['name']!r}")
+
+def encode_batch(samples, feature_columns=None, plan=None, out=None, lag_index=None):
+    """Run the encoding plan over N samples into a float32 matrix.
+
+    Equivalent to stacking prepare_input_df over every sample, without building
+    any DataFrame. Pass a precompiled (or loaded) `plan` to skip compiling one
+    from feature_columns. With a `lag_index`, samples lacking prev_day_same_hour
+    get it from the index (by 'dteday' when present, else the hour's median).
+    """
+    if plan is None:
+        plan = compile_encoding_plan(feature_columns)
+    with instrument.stage('encode.columns'):
+        cols = _as_columns(samples)
+    if not cols:
+        raise ValueError("No samples to encode")
+    n = len(next(iter(cols.values())))
+    if lag_index is not None:
+        with instrument.stage('encode.lag_lookup'):
+            _fill_prev_day_same_hour(cols, lag_index)
+    with instrument.stage('encode.transform'):
+        if out is None:
+            out = np.empty((n, len(plan['columns'])), dtype=np.float32)
+        for spec in plan['columns']:
+            out[:, spec['index']] = _apply_column(spec, cols, n)
+    return out
+
+def _fill_prev_day_same_hour(cols, lag_index):
+    looked_up = lag_index.prev_day_same_hour(cols.get('dteday'), cols['hr'])
+    # dates outside the index fall back to that hour's median
+    looked_up = np.where(np.isnan(looked_up), lag_index.prev_day_same_hour(None, cols['hr']), looked_up)
+    given = cols.get('prev_day_same_hour')
+    if given is None:
+        cols['prev_day_same_hour'] = looked_up
+    else:
+        given = given.astype(np.float64)
+        cols['prev_day_same_hour'] = np.where(np.isnan(given), looked_up, given)
+
+def _predict(model, X):
+    with warnings.catch_warnings(), instrument.stage('predict'):
+        # models fitted on a DataFrame warn when handed a bare array
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict(X)
+
+def predict_batch(model, samples, feature_columns=None, plan=None, lag_index=None):
+    """Score N samples with one model.predict call over the encode_batch matrix.
+
+    Segment models predict [casual, registered] per row; their sum is returned,
+    so callers always get cnt.
+    """
+    preds = _predict(model, encode_batch(samples, feature_columns, plan, lag_index=lag_index))
+    return preds.sum(axis=1) if preds.ndim == 2 else preds
+
+def predict_components(model, samples, feature_columns=None, plan=None, lag_index=None):
+    """casual, registered and cnt arrays from one encoding pass and one predict call.
+
+    Single-target models only have cnt.
+    """
+    preds = _predict(model, encode_batch(samples, feature_columns, plan, lag_index=lag_index))
+    if preds.ndim == 1:
+        return {'cnt': preds}
+    out = {name: preds[:, i] for i, name in enumerate(SEGMENT_COLS)}
+    out['cnt'] = preds.sum(axis=1)
+    return out
+
+def quantile_name(q):
+    """0.9 -> 'p90', 0.975 -> 'p97.5'."""
+    return f"p{round(q * 100, 3):g}"
+
+def predict_intervals(model, samples, quantiles=(0.1, 0.9), feature_columns=None, plan=None, lag_index=None):
+    """Mean and quantiles of the per-tree predictions for N samples, from one traversal.
+
+    `model` needs predict_trees (a FlatForest; explain.as_flat converts a
+    pickled RandomForest), which returns every tree's output for the batch as
+    one (n_trees, n_rows) array. Returns cnt plus one 'pXX' array per quantile;
+    segment models also give casual and registered, and their quantiles are
+    taken over each tree's casual + registered total. The band is the spread
+    of the trees, so it covers model uncertainty rather than every outcome.
+    """
+    X = encode_batch(samples, feature_columns, plan, lag_index=lag_index)
+    with instrument.stage('predict'):
+        per_tree = model.predict_trees(X)
+        out = {}
+        if per_tree.ndim == 3:
+            out.update({name: per_tree[:, :, i].mean(axis=0) for i, name in enumerate(SEGMENT_COLS)})
+            per_tree = per_tree.sum(axis=2)
+        out['cnt'] = per_tree.mean(axis=0)
+        bounds = np.quantile(per_tree, quantiles, axis=0)
+    out.update({quantile_name(q): b for q, b in zip(quantiles, bounds)})
+    return out
@@ -0,0 +1,123 @@
+# src/validation.py
+# Time-ordered cross-validation and an explicit core budget for nested parallelism.
+import contextlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from joblib import parallel_config
+from threadpoolctl import threadpool_limits
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import TimeSeriesSplit
+
+def total_cores(n_jobs=-1):
+    n_cpu = os.cpu_count() or 1
+    return n_cpu if n_jobs is None or n_jobs < 1 else min(n_jobs, n_cpu)
+
+def split_cores(n_jobs, parallel_tasks):
+    """Split a core budget into (outer workers, jobs per forest).
+
+    Outer workers (search candidates or folds) get as many cores as they have
+    tasks; whatever is left over goes to each forest's own n_jobs, so the
+    product never exceeds the budget.
+    """
+    budget = total_cores(n_jobs)
+    outer = max(1, min(parallel_tasks, budget))
+    return outer, max(1, budget // outer)
+
+@contextlib.contextmanager
+def thread_limit(n_threads):
+    """Cap OpenMP/BLAS threads here and in joblib workers started meanwhile; no-op for None.
+
+    For estimators without n_jobs (HistGradientBoosting uses every core through
+    OpenMP), so that outer workers x threads stays within the core budget.
+    """
+    if n_threads is None:
+        yield
+        return
+    # loky is joblib's (and so the searches') default backend; naming it lets joblib cap its workers' threads
+    with threadpool_limits(limits=n_threads), parallel_config('loky', inner_max_num_threads=n_threads):
+        yield
+
+def time_series_cv(n_splits=5, test_size=None, gap=0):
+    """Expanding-window (rolling-origin) splitter; rows must be in (dteday, hr) order."""
+    return TimeSeriesSplit(n_splits=n_splits, test_size=test_size, gap=gap)
+
+def chronological_split(X, y, test_size=0.2):
+    """Hold out the last test_size fraction of rows, without shuffling."""
+    cut = int(len(y) * (1 - test_size))
+    head, tail = slice(None, cut), slice(cut, None)
+    return _rows(X, head), _rows(X, tail), _rows(y, head), _rows(y, tail)
+
+def _rows(a, sl):
+    return a.iloc[sl] if hasattr(a, 'iloc') else a[sl]
+
+# what every fold of one evaluate_folds run shares, sent to each pool worker once
+_fold_data = {}
+
+def _init_fold_worker(estimator, X, y, threads=None):
+    _fold_data.update(estimator=estimator, X=_reopen(X), y=_reopen(y), threads=threads)
+
+def _shared(a):
+    """A memmapped .npy array as its path, so workers map the file instead of receiving a copy."""
+    filename = getattr(a, 'filename', None)
+    if isinstance(a, np.memmap) and filename and str(filename).endswith('.npy'):
+        whole = np.load(filename, mmap_mode='r')
+        if whole.shape == a.shape and whole.dtype == a.dtype:
+            return str(filename)
+    return np.asarray(a)
+
+def _reopen(a):
+    return np.load(a, mmap_mode='r') if isinstance(a, str) else a
+
+def _fit_fold(args):
+    train_idx, test_idx = args
+    estimator, X, y = clone(_fold_data['estimator']), _fold_data['X'], _fold_data['y']
+    with thread_limit(_fold_data['threads']):
+        t0 = time.perf_counter()
+        estimator.fit(X[train_idx], y[train_idx])
+        fit_time = time.perf_counter() - t0
+        preds = estimator.predict(X[test_idx])
+    return {
+        'train_rows': len(train_idx),
+        'test_rows': len(test_idx),
+        'fit_time': fit_time,
+        'fit_rows_per_sec': len(train_idx) / fit_time,
+        'r2': r2_score(y[test_idx], preds),
+        'mae': mean_absolute_error(y[test_idx], preds),
+    }
+
+def evaluate_folds(estimator, X, y, cv, n_jobs=-1):
+    """Fit a clone of estimator on every fold in a process pool and return per-fold stats.
+
+    The core budget is split between pool workers and the estimator's own n_jobs
+    (or, for estimators without one, a cap on its threads in each worker).
+    X and y reach each worker once (a memmapped .npy as its path); fold tasks
+    carry only their row indices.
+    """
+    folds = list(cv.split(np.zeros((len(y), 1))))
+    X, y = _shared(X), _shared(y)
+    workers, forest_jobs = split_cores(n_jobs, len(folds))
+    estimator, threads = clone(estimator), None
+    if 'n_jobs' in estimator.get_params():
+        estimator.set_params(n_jobs=forest_jobs)
+    else:
+        threads = forest_jobs
+    if workers == 1:
+        _init_fold_worker(estimator, X, y, threads)
+        try:
+            return [_fit_fold(f) for f in folds]
+        finally:
+            _fold_data.clear()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_fold_worker,
+                             initargs=(estimator, X, y, threads)) as pool:
+        return list(pool.map(_fit_fold, folds))
+
+def print_fold_report(results):
+    print(f"{'fold':>4} {'train':>8} {'test':>7} {'fit s':>8} {'rows/s':>10} {'R2':>7} {'MAE':>8}")
+    for i, r in enumerate(results):
+        print(f"{i:>4} {r['train_rows']:>8} {r['test_rows']:>7} {r['fit_time']:>8.2f} "
+              f"{r['fit_rows_per_sec']:>10,.0f} {r['r2']:>7.3f} {r['mae']:>8.2f}")
+    r2 = [r['r2'] for r in results]
+    print(f"mean R2: {np.mean(r2):.3f} (+/- {np.std(r2):.3f})")
@@ -0,0 +1,107 @@
+# src/warmup.py
+# Load serving artifacts on a background thread and warm them, so a UI can render before the model is ready.
+import json
+import threading
+import time
+import numpy as np
+import utils
+import instrument
+from forest_export import FlatForest, ARRAYS
+
+def warm_model(model, plan, lag_index=None, rows=256, seed=0):
+    """Fault in the model's pages and the encode/predict path with dummy predictions.
+
+    A memory-mapped FlatForest is read through once so every tree page is
+    resident; then a batch of random inputs (varied, to walk many different
+    paths) and a single row are scored the way requests will be.
+    """
+    if isinstance(model, FlatForest):
+        for name in ARRAYS:
+            np.asarray(getattr(model, name)).sum()
+    rng = np.random.default_rng(seed)
+    samples = {
+        'season': rng.integers(1, 5, rows), 'yr': rng.integers(0, 2, rows), 'mnth': rng.integers(1, 13, rows),
+        'holiday': rng.integers(0, 2, rows), 'weekday': rng.integers(0, 7, rows),
+        'workingday': rng.integers(0, 2, rows), 'weathersit': rng.integers(1, 5, rows),
+        'temp': rng.random(rows), 'atemp': rng.random(rows), 'hum': rng.random(rows),
+        'windspeed': rng.random(rows) * 0.6, 'hr': rng.integers(0, 24, rows),
+    }
+    utils.predict_batch(model, samples, plan=plan, lag_index=lag_index)
+    utils.predict_batch(model, {k: v[:1] for k, v in samples.items()}, plan=plan, lag_index=lag_index)
+
+class BackgroundLoader:
+    """Runs load() and then warm(resources) on a daemon thread, recording startup timings.
+
+    `ready` is set once both have finished, or failed (`error` then holds the
+    exception, re-raised by wait()). Timings are seconds since the loader was
+    created: load_s and warmup_s per step, ready_s for the whole cold start and
+    first_prediction_s once the app reports its first served prediction. They
+    go to the instrument registry as startup.* stages and, with log_path, are
+    appended there as JSON lines so startup latency can be tracked across deploys.
+    """
+
+    def __init__(self, load, warm=None, log_path=None):
+        self.load = load
+        self.warm = warm
+        self.log_path = log_path
+        self.created = time.perf_counter()
+        self.ready = threading.Event()
+        self.resources = None
+        self.error = None
+        self.stage = 'pending'
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name='model-loader', daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            self.stage = 'loading'
+            t0 = time.perf_counter()
+            resources = self.load()
+            self.timings['load_s'] = time.perf_counter() - t0
+            if self.warm is not None:
+                self.stage = 'warming'
+                t0 = time.perf_counter()
+                self.warm(resources)
+                self.timings['warmup_s'] = time.perf_counter() - t0
+            self.resources = resources
+            self.stage = 'ready'
+        except Exception as e:
+            self.error = e
+            self.stage = 'failed'
+        self.timings['ready_s'] = time.perf_counter() - self.created
+        self._record('ready', dict(self.timings))
+        self.ready.set()
+
+    def wait(self, timeout=None):
+        """Block until loading finished; return the resources or raise the load error."""
+        if not self.ready.wait(timeout):
+            raise TimeoutError(f"Model still {self.stage} after {timeout}s")
+        if self.error is not None:
+            raise self.error
+        return self.resources
+
+    def first_prediction(self):
+        """Record time-to-first-prediction; later calls are no-ops."""
+        with self.lock:
+            if 'first_prediction_s' in self.timings:
+                return
+            self.timings['first_prediction_s'] = time.perf_counter() - self.created
+        self._record('first_prediction', {'first_prediction_s': self.timings['first_prediction_s']})
+
+    def status(self):
+        return {'stage': self.stage, 'elapsed_s': time.perf_counter() - self.created,
+                'error': None if self.error is None else str(self.error), **self.timings}
+
+    def _record(self, event, timings):
+        for name, seconds in timings.items():
+            instrument.registry.observe(f"startup.{name[:-2]}", seconds)
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps({'event': event, 'time': time.time(), **timings}) + '\n')
+            except OSError as e:
+                print(f"Could not append startup metrics to {self.log_path}: {e}")
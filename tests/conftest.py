@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the modules live flat in src/, imported by name as the scripts do
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
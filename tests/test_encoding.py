@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+import utils
+
+SAMPLE = {'season': 3, 'yr': 1, 'mnth': 7, 'holiday': 0, 'weekday': 3, 'workingday': 1,
+          'weathersit': 1, 'temp': 0.7, 'atemp': 0.65, 'hum': 0.5, 'windspeed': 0.2, 'hr': 8}
+
+def plan():
+    return utils.compile_encoding_plan(utils.encoded_column_names())
+
+@pytest.mark.parametrize('field', ['yr', 'mnth', 'holiday', 'workingday', 'windspeed'])
+def test_missing_raw_field_raises(field):
+    sample = {k: v for k, v in SAMPLE.items() if k != field}
+    with pytest.raises(KeyError):
+        utils.encode_batch([sample], plan=plan())
+
+def test_prev_day_same_hour_has_default():
+    X = utils.encode_batch([SAMPLE], plan=plan())
+    names = [spec['name'] for spec in plan()['columns']]
+    assert X[0, names.index('prev_day_same_hour')] == utils.DEFAULT_PREV_DAY_SAME_HOUR
+    assert np.isfinite(X).all()
+
+def test_lag_fallback_matches_serving():
+    # first day has no previous day: training and serving both fall back to that hour's median
+    df = pd.DataFrame({'dteday': ['2011-01-01'] * 3 + ['2011-01-02'] * 3, 'hr': [0, 1, 2] * 2,
+                       'cnt': [10, 20, 30, 50, 60, 70]})
+    lag_index = utils.LagIndex.from_frame(df)
+    trained = utils.add_lag_features(df, lag_index=lag_index)['prev_day_same_hour'].to_numpy()
+    cols = {'dteday': df['dteday'].to_numpy(), 'hr': df['hr'].to_numpy(dtype=float)}
+    utils._fill_prev_day_same_hour(cols, lag_index)
+    np.testing.assert_allclose(trained, cols['prev_day_same_hour'])
+    np.testing.assert_allclose(trained[:3], [30, 40, 50])
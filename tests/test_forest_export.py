@@ -0,0 +1,45 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from forest_export import FlatForest, export_forest
+
+def fit_forest(seed, n=200):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, 4)).astype(np.float32)
+    y = X[:, 0] * 10 + X[:, 1] * (seed + 1) + rng.random(n)
+    return RandomForestRegressor(n_estimators=8, max_depth=6, random_state=seed).fit(X, y), X
+
+def test_loaded_forest_survives_a_reexport(tmp_path):
+    out_dir = str(tmp_path / 'bike_model_flat')
+    first, X = fit_forest(0)
+    export_forest(first, out_dir)
+    live = FlatForest.load(out_dir)
+    before = live.predict(X[:5]).copy()
+    second, _ = fit_forest(1)
+    export_forest(second, out_dir)
+    # the process that mapped the old export keeps serving it
+    np.testing.assert_array_equal(live.predict(X[:5]), before)
+    # a fresh load sees the new one, and no temporary directories are left behind
+    np.testing.assert_allclose(FlatForest.load(out_dir).predict(X[:5]), second.predict(X[:5]), rtol=1e-5)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['bike_model_flat']
+
+def test_flat_forest_matches_sklearn():
+    forest, X = fit_forest(0)
+    flat = FlatForest.from_model(forest)
+    per_tree = np.stack([tree.predict(X) for tree in forest.estimators_])
+    np.testing.assert_allclose(flat.predict_trees(X), per_tree, rtol=1e-5, atol=1e-4)
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-5, atol=1e-4)
+
+def test_flat_forest_matches_sklearn_multi_output():
+    forest, X = fit_forest(0)
+    y2 = np.column_stack([forest.predict(X), X[:, 2] * 5])
+    forest = RandomForestRegressor(n_estimators=8, max_depth=6, random_state=0).fit(X, y2)
+    flat = FlatForest.from_model(forest)
+    assert flat.predict_trees(X).shape == (8, len(X), 2)
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-5, atol=1e-4)
+
+def test_contributions_add_up_to_the_prediction():
+    forest, X = fit_forest(0)
+    flat = FlatForest.from_model(forest)
+    bias, contrib = flat.contributions(X)
+    assert contrib.shape == X.shape
+    np.testing.assert_allclose(bias + contrib.sum(axis=1), flat.predict(X), rtol=1e-5, atol=1e-4)
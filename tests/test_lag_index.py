@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+import utils
+
+# 2011-01-02 is missing, so 2011-01-03 has no previous day; 2011-01-04 does
+FRAME = pd.DataFrame({'dteday': ['2011-01-01'] * 2 + ['2011-01-03'] * 2 + ['2011-01-04'] * 2,
+                      'hr': [0, 1] * 3, 'cnt': [10, 20, 30, 40, 50, 60]})
+
+def test_previous_day_lookup():
+    lag_index = utils.LagIndex.from_frame(FRAME)
+    lag = lag_index.prev_day_same_hour(['2011-01-02', '2011-01-03', '2011-01-04'], [1, 0, 1])
+    np.testing.assert_allclose(lag, [20, np.nan, 40])
+    np.testing.assert_allclose(lag_index.prev_day_same_hour(None, [0, 1]), [30, 40])
+    assert lag_index.last_timestamp() == pd.Timestamp('2011-01-04 01:00')
+
+def test_prev_day_same_hour_feature():
+    lagged = utils.add_lag_features(FRAME).set_index(['dteday', 'hr'])['prev_day_same_hour']
+    # real lag where the previous day exists
+    assert lagged[('2011-01-04', 0)] == 30 and lagged[('2011-01-04', 1)] == 40
+    # the hour's median where it does not, not the median of every count (35)
+    assert lagged[('2011-01-03', 0)] == 30 and lagged[('2011-01-03', 1)] == 40
+    assert lagged[('2011-01-01', 1)] == 40
@@ -0,0 +1,26 @@
+from pred_cache import PredictionCache
+
+SAMPLE = {'season': 3, 'yr': 1, 'mnth': 7, 'holiday': 0, 'weekday': 3, 'workingday': 1,
+          'weathersit': 1, 'temp': 0.7, 'atemp': 0.65, 'hum': 0.5, 'windspeed': 0.2, 'hr': 8}
+
+OUTPUTS = {'cnt': 120.0, 'p10': 0.0, 'p90': 180.0}
+
+def test_named_outputs_are_cached_together(tmp_path):
+    calls = []
+
+    def compute(sample):
+        calls.append(sample)
+        return dict(OUTPUTS)
+
+    cache = PredictionCache('model-a', disk_path=str(tmp_path / 'cache.db'))
+    for _ in range(3):
+        assert cache.get_or_compute(SAMPLE, compute, list(OUTPUTS)) == OUTPUTS
+    assert len(calls) == 1
+    assert (cache.stats()['hits'], cache.stats()['misses']) == (2, 1)
+    # a second process sharing the file finds every value on disk, including a zero bound
+    other = PredictionCache('model-a', disk_path=str(tmp_path / 'cache.db'))
+    assert other.get_or_compute(SAMPLE, compute, list(OUTPUTS)) == OUTPUTS
+    assert len(calls) == 1 and other.stats()['disk_hits'] == 1
+    # asking for another quantile recomputes
+    other.get_or_compute(SAMPLE, lambda s: dict(compute(s), p50=100.0), ['cnt', 'p50'])
+    assert len(calls) == 2 and other.stats()['misses'] == 1
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import utils
+import serve
+
+SAMPLE = {'season': 3, 'yr': 1, 'mnth': 7, 'holiday': 0, 'weekday': 3, 'workingday': 1,
+          'weathersit': 1, 'temp': 0.7, 'atemp': 0.65, 'hum': 0.5, 'windspeed': 0.2, 'hr': 8}
+PLAN = utils.compile_encoding_plan(utils.encoded_column_names())
+HR = next(spec['index'] for spec in PLAN['columns'] if spec['name'] == 'hr')
+
+def predict_hr(samples):
+    # stands in for the model: encodes like serving does and returns each row's hour
+    return utils.encode_batch(samples, plan=PLAN)[:, HR]
+
+def samples(*hours, **overrides):
+    return [dict(SAMPLE, hr=h, **overrides) for h in hours]
+
+async def submit_all(batcher, requests):
+    task = asyncio.create_task(batcher.run())
+    try:
+        return await asyncio.gather(*(batcher.submit(r) for r in requests), return_exceptions=True)
+    finally:
+        task.cancel()
+
+def test_batch_is_sliced_per_request():
+    batcher = serve.MicroBatcher(predict_hr, max_batch=64, max_wait=0.05)
+    requests = [samples(1), samples(2, 3, 4), samples(5, 6)]
+    results = asyncio.run(submit_all(batcher, requests))
+    for request, preds in zip(requests, results):
+        np.testing.assert_array_equal(preds, [s['hr'] for s in request])
+    assert batcher.metrics.batches == 1
+
+def test_poisoned_request_fails_alone():
+    batcher = serve.MicroBatcher(predict_hr, max_batch=64, max_wait=0.05)
+    requests = [samples(1), samples(2, temp='hot'), samples(3, 4)]
+    good, bad, also_good = asyncio.run(submit_all(batcher, requests))
+    np.testing.assert_array_equal(good, [1])
+    np.testing.assert_array_equal(also_good, [3, 4])
+    assert isinstance(bad, ValueError)
+
+def test_empty_batch_is_rejected():
+    with pytest.raises(ValueError):
+        utils.encode_batch([], plan=PLAN)
+
+    async def post(body):
+        batcher = serve.MicroBatcher(predict_hr, max_batch=64, max_wait=0.05)
+        task = asyncio.create_task(batcher.run())
+        try:
+            return await serve.PredictionServer(batcher).predict(body)
+        finally:
+            task.cancel()
+
+    status, _, payload = asyncio.run(post(json.dumps({'instances': []}).encode()))
+    assert status.startswith('400')
+    status, _, payload = asyncio.run(post(json.dumps(SAMPLE).encode()))
+    assert status.startswith('200') and json.loads(payload) == {'prediction': 8}
@@ -0,0 +1,36 @@
+import os
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+import utils
+import train_model
+
+HOUR_CSV = os.path.join(os.path.dirname(__file__), '..', 'data', 'hour.csv')
+
+@pytest.mark.parametrize('strategy', ['warm_start', 'window'])
+def test_incremental_update_of_compact_model(tmp_path, strategy):
+    full = pd.read_csv(HOUR_CSV, nrows=1500)
+    first = full.iloc[:1000].copy()
+    X, y, columns = utils.build_feature_matrix_compact(first.copy())
+    model = RandomForestRegressor(n_estimators=5, max_depth=8, random_state=0).fit(X, y)
+    assert not hasattr(model, 'feature_names_in_')
+    paths = {name: str(tmp_path / name) for name in ['model.pkl', 'cols.pkl', 'meta.json', 'more.csv']}
+    joblib.dump(model, paths['model.pkl'])
+    joblib.dump(list(columns), paths['cols.pkl'])
+    last = first.iloc[-1]
+    train_model.save_train_meta(paths['meta.json'], {
+        'watermark': (pd.Timestamp(last['dteday']) + pd.Timedelta(hours=int(last['hr']))).isoformat(),
+        'train_rows': len(first), 'train_seconds': 1.0,
+        'best_params': {'n_estimators': 5, 'max_depth': 8}})
+    full.to_csv(paths['more.csv'], index=False)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        updated = train_model.incremental_update(paths['more.csv'], paths['model.pkl'], paths['cols.pkl'],
+                                                 paths['meta.json'], strategy, extra_trees=3, n_jobs=1)
+    assert not hasattr(updated, 'feature_names_in_')
+    assert len(updated.estimators_) == (8 if strategy == 'warm_start' else 5)
+    assert np.isfinite(updated.predict(X[:5])).all()
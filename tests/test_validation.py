@@ -0,0 +1,40 @@
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+import validation
+
+def make_data(tmp_path, n=400):
+    rng = np.random.default_rng(0)
+    X = np.lib.format.open_memmap(str(tmp_path / 'X.npy'), mode='w+', dtype=np.float32, shape=(n, 3))
+    X[:] = rng.random((n, 3))
+    y = (X[:, 0] * 10 + rng.random(n)).astype(np.float32)
+    X.flush()
+    return np.load(str(tmp_path / 'X.npy'), mmap_mode='r'), y
+
+def test_memmapped_matrix_is_shared_by_path(tmp_path):
+    X, y = make_data(tmp_path)
+    assert validation._shared(X) == str(tmp_path / 'X.npy')
+    # a row slice is not the whole file, so it is sent as an array
+    assert isinstance(validation._shared(X[:10]), np.ndarray)
+
+def test_folds_match_in_and_out_of_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(validation.os, 'cpu_count', lambda: 3)
+    X, y = make_data(tmp_path)
+    forest = RandomForestRegressor(n_estimators=5, random_state=0)
+    cv = validation.time_series_cv(n_splits=3)
+    pooled = validation.evaluate_folds(forest, X, y, cv, n_jobs=3)
+    inline = validation.evaluate_folds(forest, X, y, cv, n_jobs=1)
+    assert [r['train_rows'] for r in pooled] == [r['train_rows'] for r in inline]
+    np.testing.assert_allclose([r['r2'] for r in pooled], [r['r2'] for r in inline])
+
+def test_thread_limit_caps_openmp():
+    from threadpoolctl import threadpool_info
+    with validation.thread_limit(1):
+        assert all(pool['num_threads'] == 1 for pool in threadpool_info())
+
+def test_folds_of_estimator_without_n_jobs(tmp_path, monkeypatch):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    monkeypatch.setattr(validation.os, 'cpu_count', lambda: 4)
+    X, y = make_data(tmp_path)
+    folds = validation.evaluate_folds(HistGradientBoostingRegressor(max_iter=20), X, y,
+                                      validation.time_series_cv(n_splits=2), n_jobs=4)
+    assert len(folds) == 2 and all(r['r2'] > 0.5 for r in folds)